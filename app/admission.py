@@ -0,0 +1,101 @@
+import asyncio
+import math
+import os
+import time
+
+from fastapi import HTTPException
+
+# Сколько секунд запрос может ждать своей очереди
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("LIBTOOL_ADMISSION_QUEUE_TIMEOUT", "10"))
+
+
+class RouteLimiter:
+    """Ограничение одновременных запросов одного класса маршрутов с ограниченной очередью.
+
+    Используется как зависимость FastAPI: держит слот до конца ответа. Когда очередь
+    заполнена или ожидание превысило таймаут, сразу отвечает 503 с Retry-After.
+    Лимиты действуют в пределах воркера.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.max_wait_ms = 0.0
+        # Сглаженное время обработки, по нему оценивается Retry-After
+        self.avg_service_seconds = 1.0
+
+    @classmethod
+    def from_env(cls, name: str, max_concurrent: int, max_queue: int) -> "RouteLimiter":
+        prefix = f"LIBTOOL_{name.upper()}"
+        return cls(
+            name,
+            int(os.getenv(f"{prefix}_CONCURRENCY", str(max_concurrent))),
+            int(os.getenv(f"{prefix}_QUEUE", str(max_queue)))
+        )
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.avg_service_seconds * (self.waiting + 1) / self.max_concurrent))
+
+    def _reject(self, reason: str):
+        raise HTTPException(
+            503,
+            f"Сервер занят ({self.name}): {reason}, повторите позже",
+            headers={"Retry-After": str(self.retry_after())}
+        )
+
+    async def __call__(self):
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            self._reject("очередь заполнена")
+
+        self.waiting += 1
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            self._reject("истекло время ожидания")
+        finally:
+            self.waiting -= 1
+
+        started = time.monotonic()
+        self.max_wait_ms = max(self.max_wait_ms, (started - queued_at) * 1000)
+        self.admitted += 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+            self.avg_service_seconds = 0.8 * self.avg_service_seconds + 0.2 * (time.monotonic() - started)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "max_wait_ms": round(self.max_wait_ms, 1),
+            "avg_service_ms": round(self.avg_service_seconds * 1000, 1),
+        }
+
+
+# Выгрузки файлов (Excel, сертификаты) и тяжелые отчеты ограничиваются отдельно,
+# чтобы не занимать все потоки пула, нужные выдаче и возврату книг
+export_limiter = RouteLimiter.from_env("export", max_concurrent=2, max_queue=4)
+reports_limiter = RouteLimiter.from_env("reports", max_concurrent=4, max_queue=16)
+
+
+def admission_stats() -> dict:
+    return {limiter.name: limiter.stats() for limiter in (export_limiter, reports_limiter)}
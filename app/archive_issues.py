@@ -0,0 +1,25 @@
+import argparse
+
+from app.models import SessionLocal, ensure_schema, archive_store
+
+
+def archive_issues(older_than_days=None, batch_size=None, max_batches=None):
+    """Переносит давно возвращенные выдачи в архивную таблицу"""
+    ensure_schema()
+    db = SessionLocal()
+    try:
+        moved = archive_store.archive_returned(db, older_than_days, batch_size, max_batches)
+        stats = archive_store.stats(db)
+        print(f"✅ Перенесено {moved}; в book_issue {stats['hot']}, в архиве {stats['archived']}")
+        return moved
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Архивация возвращенных выдач")
+    parser.add_argument("--older-than-days", type=int, help="Возвращены раньше, чем N дней назад")
+    parser.add_argument("--batch-size", type=int, help="Размер пачки")
+    parser.add_argument("--max-batches", type=int, help="Остановиться после N пачек")
+    args = parser.parse_args()
+    archive_issues(args.older_than_days, args.batch_size, args.max_batches)
@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+
+from fastapi import Request
+from sqlalchemy import text
+from starlette.datastructures import MutableHeaders
+
+from app.models import SessionLocal, ReadOnlySessionLocal, replica_engine
+
+# Сколько секунд после своей записи клиент читает с основной БД (read-your-writes)
+READ_YOUR_WRITES_SECONDS = float(os.getenv("LIBTOOL_READ_YOUR_WRITES_SECONDS", "5"))
+# Допустимое отставание реплики, секунд
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("LIBTOOL_REPLICA_MAX_LAG_SECONDS", "5"))
+# Как часто перепроверять состояние реплики, секунд
+REPLICA_CHECK_INTERVAL = float(os.getenv("LIBTOOL_REPLICA_CHECK_SECONDS", "2"))
+
+LAST_WRITE_COOKIE = "libtool_last_write"
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Отставание реплики PostgreSQL; на основной БД (не в режиме восстановления) считаем его нулевым
+PG_REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class ReplicaMonitor:
+    """Кэширует состояние реплики, чтобы не проверять ее на каждом запросе"""
+
+    def __init__(self, engine, check_interval: float, max_lag: float):
+        self.engine = engine
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self.healthy = False
+        self.lag = None
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def is_usable(self) -> bool:
+        if self.engine is None:
+            return False
+
+        if time.monotonic() - self.checked_at >= self.check_interval:
+            # Проверяет один поток, остальные пока используют прошлый результат
+            if self._lock.acquire(blocking=False):
+                try:
+                    self._check()
+                finally:
+                    self._lock.release()
+
+        return self.healthy
+
+    def _check(self):
+        try:
+            with self.engine.connect() as connection:
+                if self.engine.dialect.name == "postgresql":
+                    self.lag = float(connection.execute(PG_REPLICA_LAG_SQL).scalar() or 0)
+                else:
+                    connection.execute(text("SELECT 1"))
+                    self.lag = 0.0
+            self.healthy = self.lag <= self.max_lag
+            if not self.healthy:
+                print(f"⚠️ Реплика отстает на {self.lag:.1f} с, чтение переключено на основную БД")
+        except Exception as e:
+            self.healthy = False
+            self.lag = None
+            print(f"⚠️ Реплика недоступна, чтение переключено на основную БД: {e}")
+        finally:
+            self.checked_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "configured": self.engine is not None,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+        }
+
+
+replica_monitor = ReplicaMonitor(replica_engine, REPLICA_CHECK_INTERVAL, REPLICA_MAX_LAG_SECONDS)
+
+
+def wrote_recently(request: Request) -> bool:
+    try:
+        last_write = float(request.cookies.get(LAST_WRITE_COOKIE, "0"))
+    except ValueError:
+        return False
+    return time.time() - last_write < READ_YOUR_WRITES_SECONDS
+
+
+def get_read_db(request: Request):
+    """Сессия для read-only маршрутов: реплика, если она жива и клиент недавно не писал"""
+    use_replica = not wrote_recently(request) and replica_monitor.is_usable()
+    request.state.db_route = "replica" if use_replica else "primary"
+
+    db = ReadOnlySessionLocal() if use_replica else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+class ReadYourWritesMiddleware:
+    """После успешной записи ставит клиенту cookie с ее временем и
+    добавляет заголовок X-DB-Route к ответам read-only маршрутов"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        is_write = scope["method"] in WRITE_METHODS
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if is_write and message["status"] < 400:
+                    headers.append(
+                        "Set-Cookie",
+                        f"{LAST_WRITE_COOKIE}={time.time():.3f}; Max-Age={int(READ_YOUR_WRITES_SECONDS) + 1}; "
+                        f"Path=/; HttpOnly; SameSite=Lax"
+                    )
+                route = scope.get("state", {}).get("db_route")
+                if route:
+                    headers["X-DB-Route"] = route
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
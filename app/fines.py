@@ -0,0 +1,191 @@
+import os
+from datetime import date, timedelta
+from typing import Optional, Dict, Any
+
+from pydantic import BaseModel
+from sqlalchemy import select, or_, and_, case, false, func, literal, Date
+from sqlalchemy.orm import Session
+
+from app.models import BookIssue, Reader
+
+# julianday() в SQLite: 1970-01-01 — день 2440587.5
+EPOCH = date(1970, 1, 1)
+JULIAN_EPOCH_DAY = 2440587.5
+
+
+class FineTariff(BaseModel):
+    """Тариф штрафов; по правилам библиотеки (п. 5.1) — 10 руб./день за каждую книгу"""
+    per_day: float = float(os.getenv("LIBTOOL_FINE_PER_DAY", "10"))
+    grace_days: int = int(os.getenv("LIBTOOL_FINE_GRACE_DAYS", "0"))
+    max_per_issue: Optional[float] = float(os.environ["LIBTOOL_FINE_MAX_PER_ISSUE"]) \
+        if os.getenv("LIBTOOL_FINE_MAX_PER_ISSUE") else None
+
+
+def day_number(value, dialect_name: str):
+    """Дата (колонка или константа) как число дней; разность двух таких чисел — дни"""
+    if isinstance(value, date):
+        if dialect_name == "postgresql":
+            return literal(value, Date)
+        return (value - EPOCH).days + JULIAN_EPOCH_DAY
+    return value if dialect_name == "postgresql" else func.julianday(value)
+
+
+def least(a, b, dialect_name: str):
+    return func.least(a, b) if dialect_name == "postgresql" else func.min(a, b)
+
+
+class FinesEngine:
+    """Расчет штрафов за просрочку: суммы по читателям считает БД, штрафы — NumPy.
+
+    Штраф по выдаче — per_day * (дни просрочки - льгота), не больше max_per_issue.
+    Выдачи в пределах льготы отбрасываются условием запроса, поэтому без предела штраф
+    линеен по дням и сумма по читателю выводится из SUM дней и числа выдач; с пределом
+    суммируются дни, ограниченные сверху. Агрегация — один GROUP BY reader_id по
+    индексу ix_book_issue_reader_dates, без сортировки. Открытые и возвращенные выдачи
+    суммируются отдельно: дни каждой выдачи вычисляются в запросе один раз.
+    """
+
+    # Колонки выборки по читателям
+    (READER_ID, OPEN_ISSUES, RETURNED_ISSUES, OPEN_DAYS, RETURNED_DAYS,
+     OPEN_BILLABLE_DAYS, RETURNED_BILLABLE_DAYS) = range(7)
+
+    def _query_parts(self, db: Session, as_of: date, tariff: FineTariff, reader_id: Optional[int],
+                     include_returned: bool):
+        """Выражения дней просрочки открытой и возвращенной выдачи, предел дней, условия отбора"""
+        dialect_name = db.get_bind().dialect.name
+        planned = day_number(BookIssue.planned_return_date, dialect_name)
+        open_days = day_number(as_of, dialect_name) - planned
+        returned_days = day_number(BookIssue.actual_return_date, dialect_name) - planned
+
+        # Штраф больше нуля, только если просрочка длиннее льготы. Для открытых выдач
+        # условие сводится к сравнению срока с константой
+        is_open = BookIssue.actual_return_date.is_(None)
+        periods = [and_(is_open, BookIssue.planned_return_date < as_of - timedelta(days=tariff.grace_days))]
+        if include_returned:
+            late = [BookIssue.actual_return_date > BookIssue.planned_return_date]
+            if tariff.grace_days:
+                late.append(returned_days > tariff.grace_days)
+            periods.append(and_(*late))
+
+        conditions = [or_(*periods)]
+        if tariff.per_day <= 0 or (tariff.max_per_issue is not None and tariff.max_per_issue <= 0):
+            conditions.append(false())
+        if reader_id is not None:
+            conditions.append(BookIssue.reader_id == reader_id)
+
+        # Предел штрафа — предел оплачиваемых дней
+        max_days = None
+        if tariff.max_per_issue is not None and tariff.per_day > 0:
+            max_days = tariff.grace_days + tariff.max_per_issue / tariff.per_day
+        return dialect_name, is_open, open_days, returned_days, max_days, conditions
+
+    def fetch(self, db: Session, as_of: date, tariff: FineTariff, reader_id: Optional[int] = None,
+              include_returned: bool = True):
+        """Матрица float64: по строке на читателя со штрафом, колонки READER_ID..RETURNED_BILLABLE_DAYS"""
+        import numpy as np
+
+        dialect_name, is_open, open_days, returned_days, max_days, conditions = \
+            self._query_parts(db, as_of, tariff, reader_id, include_returned)
+        is_returned = BookIssue.actual_return_date.isnot(None)
+
+        sums = [case((is_open, open_days)), case((is_returned, returned_days))]
+        if max_days is not None:
+            sums += [
+                case((is_open, least(open_days, max_days, dialect_name))),
+                case((is_returned, least(returned_days, max_days, dialect_name)))
+            ]
+
+        stmt = select(
+            BookIssue.reader_id,
+            func.count() - func.count(BookIssue.actual_return_date),
+            func.count(BookIssue.actual_return_date),
+            *[func.coalesce(func.sum(expr), 0) for expr in sums]
+        ).where(*conditions).group_by(BookIssue.reader_id)
+
+        columns = np.array(db.execute(stmt).all(), dtype=np.float64).reshape(-1, len(sums) + 3)
+        if max_days is None:
+            # Без предела оплачиваются все дни сверх льготы
+            columns = np.hstack([columns, columns[:, [self.OPEN_DAYS, self.RETURNED_DAYS]]])
+        return columns
+
+    def compute(self, columns, tariff: FineTariff):
+        """Штрафы по читателям: (по открытым выдачам, по возвращенным с опозданием)"""
+        open_amount = (columns[:, self.OPEN_BILLABLE_DAYS]
+                       - tariff.grace_days * columns[:, self.OPEN_ISSUES]) * tariff.per_day
+        returned_amount = (columns[:, self.RETURNED_BILLABLE_DAYS]
+                           - tariff.grace_days * columns[:, self.RETURNED_ISSUES]) * tariff.per_day
+        return open_amount, returned_amount
+
+    def top_issues(self, db: Session, as_of: date, tariff: FineTariff, reader_id: Optional[int],
+                   include_returned: bool, top: int):
+        """Самые крупные штрафы по выдачам: штраф растет с днями, сортировка — по дням"""
+        dialect_name, is_open, open_days, returned_days, max_days, conditions = \
+            self._query_parts(db, as_of, tariff, reader_id, include_returned)
+        days = case((is_open, open_days), else_=returned_days)
+        billable = days if max_days is None else least(days, max_days, dialect_name)
+
+        stmt = select(
+            BookIssue.id, BookIssue.reader_id, BookIssue.book_id, days, BookIssue.actual_return_date.isnot(None)
+        ).where(*conditions).order_by(billable.desc(), BookIssue.id).limit(top)
+
+        issues = []
+        for issue_id, issue_reader_id, book_id, issue_days, returned in db.execute(stmt):
+            amount = (issue_days - tariff.grace_days) * tariff.per_day
+            if tariff.max_per_issue is not None:
+                amount = min(amount, tariff.max_per_issue)
+            issues.append({
+                "issue_id": issue_id,
+                "reader_id": issue_reader_id,
+                "book_id": book_id,
+                "overdue_days": int(round(issue_days)),
+                "amount": float(amount),
+                "returned": bool(returned)
+            })
+        return issues
+
+    def report(self, db: Session, tariff: FineTariff, as_of: Optional[date] = None,
+               reader_id: Optional[int] = None, include_returned: bool = True,
+               top: int = 50, include_issues: bool = False) -> Dict[str, Any]:
+        import numpy as np
+
+        as_of = as_of or date.today()
+        columns = self.fetch(db, as_of, tariff, reader_id, include_returned)
+        open_amount, returned_amount = self.compute(columns, tariff)
+        reader_ids = columns[:, self.READER_ID].astype(np.int64)
+        issues = columns[:, self.OPEN_ISSUES] + columns[:, self.RETURNED_ISSUES]
+        days = columns[:, self.OPEN_DAYS] + columns[:, self.RETURNED_DAYS]
+        totals = open_amount + returned_amount
+        order = np.argsort(-totals, kind="stable")[:top]
+
+        top_ids = [int(reader_ids[i]) for i in order]
+        names = dict(db.query(Reader.id, Reader.full_name).filter(Reader.id.in_(top_ids)).all()) if top_ids else {}
+
+        result = {
+            "as_of": as_of,
+            "tariff": tariff.model_dump(),
+            "totals": {
+                "issues": int(issues.sum()),
+                "readers": int(len(reader_ids)),
+                "overdue_days": int(round(days.sum())),
+                "amount": float(totals.sum()),
+                "open_amount": float(open_amount.sum()),
+                "returned_late_amount": float(returned_amount.sum())
+            },
+            "readers": [
+                {
+                    "reader_id": int(reader_ids[i]),
+                    "reader_name": names.get(int(reader_ids[i]), "Unknown"),
+                    "issues": int(issues[i]),
+                    "overdue_days": int(round(days[i])),
+                    "amount": float(totals[i])
+                }
+                for i in order
+            ]
+        }
+
+        if include_issues:
+            result["issues"] = self.top_issues(db, as_of, tariff, reader_id, include_returned, top)
+
+        return result
+
+fines_engine = FinesEngine()
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import tempfile
+
+from sqlalchemy import text
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Ключ advisory lock в PostgreSQL: байты строки "LibTool"
+MAINTENANCE_LOCK_KEY = int.from_bytes(b"LibTool", "big")
+# Явный путь к файлу блокировки (SQLite); по умолчанию свой файл на каждую БД
+MAINTENANCE_LOCK_FILE = os.getenv("LIBTOOL_MAINTENANCE_LOCK_FILE")
+
+
+def default_lock_file(url) -> str:
+    """Файл блокировки во временном каталоге, имя зависит от адреса БД:
+    экземпляры с разными базами не блокируют друг друга"""
+    digest = hashlib.sha1(str(url).encode()).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"libtool-maintenance-{digest}.lock")
+
+
+class LeaderLock:
+    """Блокировка "лидера" среди воркеров и экземпляров: обслуживание при старте
+    выполняет только захвативший ее воркер, остальные не ждут и сразу готовы.
+
+    Лидер отпускает блокировку, закончив обслуживание. Воркеры и экземпляры,
+    стартующие позже, снова становятся лидерами, но по отметке о выполненном
+    обслуживании (см. maintenance_done в app/models.py) пропускают его.
+
+    PostgreSQL — сессионный pg_try_advisory_lock на отдельном соединении,
+    иначе (SQLite) — неблокирующая файловая блокировка.
+    """
+
+    def __init__(self, engine, key: int = MAINTENANCE_LOCK_KEY, lock_file: str = None):
+        self.engine = engine
+        self.key = key
+        self.lock_file = lock_file or MAINTENANCE_LOCK_FILE or default_lock_file(engine.url)
+        self.is_leader = False
+        self._connection = None
+        self._file = None
+
+    def acquire(self) -> bool:
+        """Пытается стать лидером, не дожидаясь блокировки"""
+        if self.is_leader:
+            return True
+
+        if self.engine.dialect.name == "postgresql":
+            connection = self.engine.connect()
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}
+            ).scalar()
+            connection.commit()
+            if acquired:
+                self._connection = connection
+            else:
+                connection.close()
+        else:
+            acquired = self._acquire_file()
+
+        self.is_leader = bool(acquired)
+        return self.is_leader
+
+    def _acquire_file(self) -> bool:
+        lock = open(self.lock_file, "a+")
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock.close()
+            return False
+
+        self._file = lock
+        return True
+
+    def release(self):
+        if not self.is_leader:
+            return
+
+        try:
+            if self._connection is not None:
+                self._connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+                self._connection.commit()
+                self._connection.close()
+            if self._file is not None:
+                if fcntl is not None:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+                else:
+                    self._file.seek(0)
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+                self._file.close()
+        finally:
+            self._connection = None
+            self._file = None
+            self.is_leader = False
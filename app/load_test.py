@@ -0,0 +1,296 @@
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict, Counter
+from datetime import date, timedelta
+from pathlib import Path
+
+import httpx
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+# Смесь операций по умолчанию (веса)
+DEFAULT_MIX = "issue=45,return=35,list=15,export=5"
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        mix[name.strip()] = float(weight)
+    unknown = set(mix) - {"issue", "return", "list", "export"}
+    if unknown:
+        raise ValueError(f"Неизвестные операции: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class LoadTest:
+    """Имитация пиковой нагрузки на стойки выдачи.
+
+    Запросы идут с заданной частотой (открытая модель: следующий запрос не ждет
+    предыдущего), доля выдач приходится на несколько "горячих" книг.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, args):
+        self.client = client
+        self.args = args
+        self.mix = parse_mix(args.mix)
+        self.book_ids = []
+        self.hot_book_ids = []
+        self.reader_ids = []
+        self.initial_counts = {}
+        self.open_issues = []
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.transport_errors = Counter()
+
+    async def seed(self):
+        """Создает книги (горячие — с малым числом экземпляров) и читателей"""
+        suffix = int(time.time())
+        for i in range(self.args.books):
+            is_hot = i < self.args.hot_books
+            count = self.args.hot_copies if is_hot else self.args.copies
+            response = await self.client.post("/api/books", json={
+                "name": f"Нагрузочный тест {suffix}-{i}",
+                "author": "LoadTest",
+                "genre": "hot" if is_hot else "load",
+                "count": count
+            })
+            response.raise_for_status()
+            book = response.json()
+            self.book_ids.append(book["id"])
+            self.initial_counts[book["id"]] = count
+            if is_hot:
+                self.hot_book_ids.append(book["id"])
+
+        for i in range(self.args.readers):
+            response = await self.client.post("/api/readers", json={"full_name": f"Читатель нагрузки {suffix}-{i}"})
+            response.raise_for_status()
+            self.reader_ids.append(response.json()["id"])
+
+    async def call(self, operation, method, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.transport_errors[type(e).__name__] += 1
+            self.statuses[operation]["error"] += 1
+            return None
+        self.latencies[operation].append((time.perf_counter() - started) * 1000)
+        self.statuses[operation][response.status_code] += 1
+        return response
+
+    async def op_issue(self):
+        if self.hot_book_ids and random.random() < self.args.hot_ratio:
+            book_id = random.choice(self.hot_book_ids)
+        else:
+            book_id = random.choice(self.book_ids)
+        response = await self.call("issue", "POST", "/api/issues", json={
+            "book_id": book_id,
+            "reader_id": random.choice(self.reader_ids),
+            "planned_return_date": (date.today() + timedelta(days=14)).isoformat()
+        })
+        if response is not None and response.status_code == 200:
+            self.open_issues.append(response.json()["id"])
+
+    async def op_return(self):
+        if not self.open_issues:
+            await self.op_list()
+            return
+        issue_id = self.open_issues.pop(random.randrange(len(self.open_issues)))
+        await self.call("return", "POST", f"/api/issues/{issue_id}/return")
+
+    async def op_list(self):
+        url = random.choice(["/api/books", "/api/readers", "/api/issues"])
+        await self.call("list", "GET", url)
+
+    async def op_export(self):
+        await self.call("export", "GET", "/api/issues/export-excel")
+
+    async def run(self):
+        operations = list(self.mix)
+        weights = [self.mix[name] for name in operations]
+        handlers = {
+            "issue": self.op_issue,
+            "return": self.op_return,
+            "list": self.op_list,
+            "export": self.op_export
+        }
+
+        limiter = asyncio.Semaphore(self.args.concurrency)
+        tasks = set()
+        dropped = 0
+
+        async def guarded(handler):
+            async with limiter:
+                await handler()
+
+        interval = 1.0 / self.args.rate
+        started = time.perf_counter()
+        next_at = started
+        while time.perf_counter() - started < self.args.duration:
+            # Если все слоты заняты, запрос считается недоотправленным (клиент не успевает)
+            if limiter.locked():
+                dropped += 1
+            else:
+                operation = random.choices(operations, weights)[0]
+                task = asyncio.create_task(guarded(handlers[operation]))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            next_at += random.expovariate(1.0 / interval) if self.args.poisson else interval
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+
+        if tasks:
+            await asyncio.gather(*tasks)
+        return time.perf_counter() - started, dropped
+
+    async def check_invariants(self):
+        """Проверяет остатки книг после прогона"""
+        books = {book["id"]: book for book in (await self.client.get("/api/books")).json()}
+        issues = (await self.client.get("/api/issues")).json()
+        active = Counter(issue["book_id"] for issue in issues if issue["status"] in ("issued", "overdue"))
+
+        violations = []
+        for book_id in self.book_ids:
+            book = books.get(book_id)
+            if book is None:
+                violations.append(f"книга {book_id} пропала")
+                continue
+            expected = self.initial_counts[book_id] - active[book_id]
+            if book["count"] < 0:
+                violations.append(f"книга {book_id}: отрицательный остаток {book['count']}")
+            if book["count"] != expected:
+                violations.append(f"книга {book_id}: остаток {book['count']}, ожидалось {expected} "
+                                  f"(выдано {active[book_id]} из {self.initial_counts[book_id]})")
+            if (book["count"] > 0) != (book["status"] == "available"):
+                violations.append(f"книга {book_id}: статус {book['status']} при остатке {book['count']}")
+        return violations
+
+    def report(self, elapsed, dropped, violations):
+        total = sum(sum(counter.values()) for counter in self.statuses.values())
+        print(f"\n📊 Длительность {elapsed:.1f} с, запросов {total}, "
+              f"пропускная способность {total / elapsed:.1f} req/s, не отправлено {dropped}")
+        print(f"{'операция':<8} {'кол-во':>7} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'ошибки':>7} {'409':>7}")
+        for operation, counter in sorted(self.statuses.items()):
+            count = sum(counter.values())
+            latencies = self.latencies[operation]
+            # 409 — штатный отказ (нет свободных экземпляров), считается отдельно
+            errors = sum(n for status, n in counter.items() if status == "error" or (status >= 400 and status != 409))
+            conflicts = counter.get(409, 0)
+            print(f"{operation:<8} {count:>7} "
+                  f"{percentile(latencies, 50):>7.1f}ms {percentile(latencies, 90):>7.1f}ms "
+                  f"{percentile(latencies, 99):>7.1f}ms {max(latencies, default=0):>7.1f}ms "
+                  f"{errors / count:>7.1%} {conflicts / count:>7.1%}")
+            other = {status: n for status, n in counter.items() if status not in (200, 409)}
+            if other:
+                print(f"         прочие статусы: {other}")
+        if self.transport_errors:
+            print(f"⚠️ Сетевые ошибки: {dict(self.transport_errors)}")
+
+        if violations:
+            print(f"❌ Нарушено инвариантов: {len(violations)}")
+            for violation in violations[:20]:
+                print(f"   {violation}")
+        else:
+            print("✅ Инварианты остатков соблюдены")
+
+
+def start_server(port: int, database_url: str):
+    """Запускает локальный экземпляр app.main:app на указанной БД"""
+    env = os.environ.copy()
+    env["LIBTOOL_DATABASE_URL"] = database_url
+    env.pop("LIBTOOL_REPLICA_URL", None)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=PROJECT_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{url}/api/health", timeout=1).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        if process.poll() is not None:
+            raise RuntimeError("Сервер завершился при запуске")
+        time.sleep(0.3)
+    process.terminate()
+    raise RuntimeError("Сервер не ответил за 30 с")
+
+
+async def main_async(args, url):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        test = LoadTest(client, args)
+        await test.seed()
+        print(f"🚦 {url}: {args.rate} req/s, {args.duration} с, смесь {args.mix}, "
+              f"горячих книг {len(test.hot_book_ids)} (доля выдач {args.hot_ratio:.0%})")
+        elapsed, dropped = await test.run()
+        violations = await test.check_invariants()
+        test.report(elapsed, dropped, violations)
+        return 1 if violations else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест стоек выдачи LibTool")
+    parser.add_argument("--url", help="Адрес запущенного экземпляра; без него поднимается локальный")
+    parser.add_argument("--port", type=int, default=8765, help="Порт локального экземпляра")
+    parser.add_argument("--database-url", help="БД локального экземпляра; по умолчанию временный файл SQLite")
+    parser.add_argument("--rate", type=float, default=50, help="Целевая частота запросов, req/s")
+    parser.add_argument("--duration", type=float, default=30, help="Длительность, с")
+    parser.add_argument("--concurrency", type=int, default=64, help="Максимум запросов в полете")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Веса операций: issue,return,list,export")
+    parser.add_argument("--books", type=int, default=50, help="Сколько книг создать")
+    parser.add_argument("--copies", type=int, default=20, help="Экземпляров обычной книги")
+    parser.add_argument("--hot-books", type=int, default=3, help="Сколько книг сделать горячими")
+    parser.add_argument("--hot-copies", type=int, default=5, help="Экземпляров горячей книги")
+    parser.add_argument("--hot-ratio", type=float, default=0.7, help="Доля выдач, приходящихся на горячие книги")
+    parser.add_argument("--readers", type=int, default=200, help="Сколько читателей создать")
+    parser.add_argument("--poisson", action="store_true", help="Пуассоновский поток вместо равномерного")
+    parser.add_argument("--timeout", type=float, default=30, help="Таймаут запроса, с")
+    parser.add_argument("--seed", type=int, help="Seed генератора случайных чисел")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    process = None
+    temp_dir = None
+    url = args.url
+    if not url:
+        # Тест создает книги и читателей, поэтому без явного адреса не трогает рабочую БД
+        # (LIBTOOL_DATABASE_URL из окружения не используется)
+        database_url = args.database_url
+        if not database_url:
+            temp_dir = tempfile.TemporaryDirectory(prefix="libtool-load-")
+            database_url = f"sqlite:///{Path(temp_dir.name) / 'load_test.db'}"
+        print(f"🗄️ БД локального экземпляра: {database_url}")
+        process, url = start_server(args.port, database_url)
+    try:
+        sys.exit(asyncio.run(main_async(args, url)))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
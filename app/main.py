@@ -1,31 +1,52 @@
-import openpyxl
-from fastapi import FastAPI, HTTPException, Depends, Request
-from fastapi.responses import JSONResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, HTTPException, Depends, Request, Query
+from fastapi.responses import JSONResponse, FileResponse, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from pathlib import Path
-from typing import List
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
-from docx import Document
-import shutil, os
+from typing import List, Optional
+import io
+import os
+import threading
 import random
+import socket
 import time
-from datetime import datetime
+from datetime import datetime, date, timedelta
+from urllib.parse import quote
 
 # Импортируем только необходимые функции и классы
 from app.models import (
-    get_db, create_tables,
-    BookCreate, BookUpdate, BookOut,
-    ReaderCreate, ReaderUpdate, ReaderOut,
-    BookIssueCreate, BookIssueOut,
-    book_store, reader_store, book_issue_store
+    get_db, ensure_schema, maintenance_done, record_maintenance, engine, SessionLocal,
+    BookCreate, BookUpdate, BookOut, BookPage, BookLookupOut,
+    ReaderCreate, ReaderUpdate, ReaderOut, ReaderPage, ReaderLookupOut,
+    BookIssueCreate, BookIssueOut, BookIssuePage, BookIssueStatus, CirculationEventPage,
+    book_store, reader_store, book_issue_store, circulation_store, archive_store, event_journal
 )
+from app.create_rules_pdf import get_rules_pdf
+from app.compression import JSONCompressionMiddleware
+from app.static_assets import AssetStaticFiles, asset_url
+from app.db_routing import get_read_db, replica_monitor, ReadYourWritesMiddleware
+from app.leader import LeaderLock
+from app.fines import FineTariff, fines_engine
+from app.admission import export_limiter, reports_limiter, admission_stats
+from app.profiling import ProfilingMiddleware, ProfiledRoute, profile_store, require_profile_token
 
 # Создаем приложение
 app = FastAPI(title="LibTool", version="2.0.0")
+# Обычные (def) обработчики выполняются в пуле потоков; так они попадают в профиль запроса
+app.router.route_class = ProfiledRoute
+
+# Сжатие больших JSON-ответов (списки книг, читателей, выдач)
+app.add_middleware(JSONCompressionMiddleware, minimum_size=1024)
+
+# Чтение с реплики: после своей записи клиент какое-то время читает с основной БД
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Профилирование отдельных запросов (заголовок X-Profile или LIBTOOL_PROFILE_SAMPLE_RATE)
+app.add_middleware(ProfilingMiddleware)
+
+# Блокировка лидера для обслуживания при старте
+maintenance_lock = LeaderLock(engine)
 
 # Пути к статическим файлам
 BASE_DIR = Path(__file__).resolve().parent  # Текущая директория (app)
@@ -36,9 +57,10 @@ templates_dir = BASE_DIR / 'templates'
 static_dir.mkdir(exist_ok=True, parents=True)
 templates_dir.mkdir(exist_ok=True, parents=True)
 
-# Монтируем статические файлы
-app.mount("/static", StaticFiles(directory=static_dir), name="static")
+# Монтируем статические файлы (собранные версии из static/dist отдаются как immutable)
+app.mount("/static", AssetStaticFiles(directory=static_dir), name="static")
 templates = Jinja2Templates(directory=templates_dir)
+templates.env.globals["asset_url"] = asset_url
 
 
 # Функция очистки временных файлов сертификатов
@@ -66,38 +88,107 @@ def cleanup_temp_certificates(max_age_hours=24):
         print(f"⚠️ Ошибка при очистке временных файлов: {e}")
 
 
-# Создаем таблицы при запуске
-@app.on_event("startup")
-def startup_event():
-    create_tables()
+# Длительность этапов старта воркера, мс (см. app/startup_report.py)
+startup_timings = {}
+
+
+def timed(stage, func, *args):
+    started = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        startup_timings[stage] = round((time.perf_counter() - started) * 1000, 1)
+
+
+# Обслуживание при старте: схема, временные файлы, просрочки.
+# Выполняется только лидером (см. app/leader.py) и не чаще раза в день
+def run_startup_maintenance():
+    # Схема создается, только если сохраненная версия не совпадает с текущими моделями
+    if timed("schema", ensure_schema):
+        print("🛠️ Схема БД создана/обновлена")
+
+    today = date.today()
+    if timed("maintenance_marker", maintenance_done, today):
+        print(f"⏭️ Обслуживание за {today} уже выполнено")
+        return
 
     # Очищаем старые временные файлы
-    cleanup_temp_certificates()
+    timed("cleanup_temp_certificates", cleanup_temp_certificates)
 
     # Автоматическая проверка просрочек при запуске
+    db = SessionLocal()
     try:
-        db = next(get_db())
-        updated_count = book_issue_store.check_overdue_issues(db)
+        updated_count = timed("check_overdue", book_issue_store.check_overdue_issues, db)
         print(f"🔍 Автоматически проверены просрочки: обновлено {updated_count} выдач")
     except Exception as e:
         print(f"⚠️ Ошибка автоматической проверки просрочек: {e}")
+    finally:
+        db.close()
+
+    record_maintenance(today, f"{socket.gethostname()}:{os.getpid()}")
+
+
+def warm_rules_pdf():
+    try:
+        get_rules_pdf()
+    except Exception as e:
+        print(f"⚠️ Ошибка генерации правил библиотеки: {e}")
+
+
+@app.on_event("startup")
+def startup_event():
+    try:
+        is_leader = timed("leader_lock", maintenance_lock.acquire)
+    except Exception as e:
+        print(f"⚠️ Не удалось получить блокировку обслуживания: {e}")
+        is_leader = False
+
+    if is_leader:
+        print(f"👑 Воркер {os.getpid()} выполняет обслуживание при старте")
+        try:
+            run_startup_maintenance()
+        finally:
+            maintenance_lock.release()
+    else:
+        print(f"⏭️ Воркер {os.getpid()}: обслуживание выполняет другой воркер")
+
+    # Журнал событий пишется в БД фоновым потоком каждого воркера
+    event_journal.start()
+
+    # Собираем PDF с правилами в фоне: первое скачивание будет мгновенным,
+    # а готовность воркера не ждет reportlab
+    threading.Thread(target=warm_rules_pdf, name="rules-pdf-warmup", daemon=True).start()
 
     # Проверка директорий
     print("🔍 Проверка структуры директорий:")
     print(f"BASE_DIR: {BASE_DIR}")
     print(f"static_dir: {static_dir} (существует: {static_dir.exists()})")
     print(f"templates_dir: {templates_dir} (существует: {templates_dir.exists()})")
+    print(f"⏱️ Этапы старта воркера {os.getpid()}, мс: {startup_timings}")
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    # Записываем события, оставшиеся в буфере журнала
+    event_journal.stop()
 
 
 # Экспорт списка выдач в Excel - ОБНОВЛЕННАЯ ВЕРСИЯ
-@app.get("/api/issues/export-excel")
-async def export_issues_to_excel(db: Session = Depends(get_db)):
+# Тяжелые выгрузки и отчеты объявлены обычными функциями: FastAPI выполняет их в пуле
+# потоков, и цикл событий остается свободным для выдачи и возврата книг
+@app.get("/api/issues/export-excel", dependencies=[Depends(export_limiter)])
+def export_issues_to_excel(db: Session = Depends(get_read_db)):
     """Экспорт списка выдач в Excel файл"""
+    # openpyxl загружается при первом экспорте, а не при старте приложения
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment, Border, Side
+    from openpyxl.utils import get_column_letter
+
     try:
         print("🔍 Запрос на экспорт выдач в Excel...")
 
-        # Получаем все выдачи
-        issues = book_issue_store.list_issues(db)
+        # Получаем все выдачи, включая перенесенные в архив
+        issues = book_issue_store.list_issues(db, include_archived=True)
         print(f"📊 Найдено {len(issues)} выдач для экспорта")
 
         # Создаем Excel workbook
@@ -172,27 +263,18 @@ async def export_issues_to_excel(db: Session = Depends(get_db)):
         ws.cell(row=signature_row, column=1).font = Font(size=12)
         ws.cell(row=signature_row, column=1).alignment = Alignment(horizontal='right')
 
-        # Сохраняем временный файл
-        temp_dir = templates_dir / "temp_exports"
-        temp_dir.mkdir(exist_ok=True)
-
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"выдачи_книг_{timestamp}.xlsx"
-        file_path = temp_dir / filename
-
-        wb.save(file_path)
-        print(f"✅ Excel файл создан: {file_path}")
-        print(f"📁 Размер файла: {file_path.stat().st_size} байт")
-
-        # Проверяем что файл создался
-        if not file_path.exists():
-            raise Exception("Файл не был создан")
+        # Книга собирается в памяти: на диске не остается файлов от каждой выгрузки
+        buffer = io.BytesIO()
+        wb.save(buffer)
+        content = buffer.getvalue()
+        filename = f"выдачи_книг_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        print(f"✅ Excel файл создан: {filename}, {len(content)} байт")
 
         # Возвращаем файл для скачивания
-        return FileResponse(
-            path=file_path,
-            filename=filename,
-            media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        return Response(
+            content,
+            media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            headers={"Content-Disposition": f"attachment; filename*=utf-8''{quote(filename)}"}
         )
 
     except Exception as e:
@@ -208,7 +290,7 @@ async def index(request: Request):
 
 # API для книг
 @app.get("/api/books", response_model=List[BookOut])
-async def get_books(db: Session = Depends(get_db)):
+async def get_books(db: Session = Depends(get_read_db)):
     try:
         books = book_store.list_books(db)
         return books
@@ -216,8 +298,35 @@ async def get_books(db: Session = Depends(get_db)):
         raise HTTPException(500, f"Ошибка загрузки книг: {str(e)}")
 
 
+# Постраничная загрузка для таблиц интерфейса (как и lookup, объявлена до /{book_id})
+@app.get("/api/books/page", response_model=BookPage)
+async def get_books_page(
+        q: Optional[str] = Query(None, max_length=100),
+        status: Optional[str] = Query(None, pattern="^(available|issued)$"),
+        sort: str = Query("default", pattern="^(default|count_asc|count_desc)$"),
+        limit: int = Query(100, ge=1, le=500),
+        cursor: Optional[str] = None,
+        db: Session = Depends(get_read_db)
+):
+    """Книги с поиском по названию/автору, фильтром по статусу и keyset-пагинацией"""
+    try:
+        return book_store.page_books(db, q, status, sort, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+
+# Подсказки для формы выдачи (объявлены до /{book_id}, иначе "lookup" примется за ID)
+@app.get("/api/books/lookup", response_model=List[BookLookupOut])
+async def lookup_books(
+        prefix: str = Query(..., min_length=1, max_length=100),
+        limit: int = Query(10, ge=1, le=50),
+        db: Session = Depends(get_read_db)
+):
+    return book_store.lookup_books(db, prefix, limit)
+
+
 @app.get("/api/books/{book_id}", response_model=BookOut)
-async def get_book(book_id: int, db: Session = Depends(get_db)):
+async def get_book(book_id: int, db: Session = Depends(get_read_db)):
     book = book_store.get_book(db, book_id)
     if not book:
         raise HTTPException(404, "Книга не найдена")
@@ -250,7 +359,7 @@ async def delete_book(book_id: int, db: Session = Depends(get_db)):
 
 # API для читателей
 @app.get("/api/readers", response_model=List[ReaderOut])
-async def get_readers(db: Session = Depends(get_db)):
+async def get_readers(db: Session = Depends(get_read_db)):
     try:
         readers = reader_store.list_readers(db)
         return readers
@@ -258,6 +367,57 @@ async def get_readers(db: Session = Depends(get_db)):
         raise HTTPException(500, f"Ошибка загрузки читателей: {str(e)}")
 
 
+@app.get("/api/readers/page", response_model=ReaderPage)
+async def get_readers_page(
+        q: Optional[str] = Query(None, max_length=100),
+        status: Optional[str] = Query(None, pattern="^(active|inactive)$"),
+        limit: int = Query(100, ge=1, le=500),
+        cursor: Optional[str] = None,
+        db: Session = Depends(get_read_db)
+):
+    """Читатели с поиском по ФИО, фильтром по статусу и keyset-пагинацией"""
+    try:
+        return reader_store.page_readers(db, q, status, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+
+@app.get("/api/readers/lookup", response_model=List[ReaderLookupOut])
+async def lookup_readers(
+        prefix: str = Query(..., min_length=1, max_length=100),
+        limit: int = Query(10, ge=1, le=50),
+        db: Session = Depends(get_read_db)
+):
+    return reader_store.lookup_readers(db, prefix, limit)
+
+
+@app.get("/api/readers/{reader_id}", response_model=ReaderOut)
+async def get_reader(reader_id: int, db: Session = Depends(get_read_db)):
+    reader = reader_store.get_reader(db, reader_id)
+    if not reader:
+        raise HTTPException(404, "Читатель не найден")
+    return reader
+
+
+@app.get("/api/readers/{reader_id}/issues", response_model=BookIssuePage)
+async def get_reader_issues(
+        reader_id: int,
+        status: Optional[List[BookIssueStatus]] = Query(None),
+        limit: int = Query(50, ge=1, le=500),
+        cursor: Optional[str] = None,
+        db: Session = Depends(get_read_db)
+):
+    """История выдач читателя с фильтром по статусу и keyset-пагинацией"""
+    if not reader_store.exists(db, reader_id):
+        raise HTTPException(404, "Читатель не найден")
+
+    statuses = [s.value for s in status] if status else None
+    try:
+        return book_issue_store.list_reader_issues(db, reader_id, statuses, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+
 @app.post("/api/readers", response_model=ReaderOut)
 async def create_reader(reader: ReaderCreate, db: Session = Depends(get_db)):
     try:
@@ -284,7 +444,7 @@ async def delete_reader(reader_id: int, db: Session = Depends(get_db)):
 
 # API для выдачи/возврата книг
 @app.get("/api/issues", response_model=List[BookIssueOut])
-async def get_issues(db: Session = Depends(get_db)):
+async def get_issues(db: Session = Depends(get_read_db)):
     try:
         issues = book_issue_store.list_issues(db)
         return issues
@@ -292,10 +452,27 @@ async def get_issues(db: Session = Depends(get_db)):
         raise HTTPException(500, f"Ошибка загрузки выдач: {str(e)}")
 
 
+@app.get("/api/issues/page", response_model=BookIssuePage)
+async def get_issues_page(
+        status: Optional[List[BookIssueStatus]] = Query(None),
+        limit: int = Query(100, ge=1, le=500),
+        cursor: Optional[str] = None,
+        db: Session = Depends(get_read_db)
+):
+    """Текущие выдачи, новые сначала, с фильтром по статусу и keyset-пагинацией"""
+    statuses = [s.value for s in status] if status else None
+    try:
+        return book_issue_store.page_issues(db, statuses, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+
 @app.post("/api/issues", response_model=BookIssueOut)
 async def issue_book(issue: BookIssueCreate, db: Session = Depends(get_db)):
     try:
         return book_issue_store.issue_book(db, issue)
+    except ValueError as e:
+        raise HTTPException(409, str(e))
     except Exception as e:
         raise HTTPException(500, f"Ошибка выдачи книги: {str(e)}")
 
@@ -322,6 +499,24 @@ async def check_overdue_issues(db: Session = Depends(get_db)):
         raise HTTPException(500, f"Ошибка проверки просрочек: {str(e)}")
 
 
+# Архивация давно возвращенных выдач
+@app.post("/api/issues/archive")
+async def archive_issues(
+        older_than_days: Optional[int] = Query(None, ge=0),
+        batch_size: Optional[int] = Query(None, ge=1, le=100000),
+        max_batches: Optional[int] = Query(None, ge=1),
+        db: Session = Depends(get_db)
+):
+    """Перенести возвращенные выдачи старше older_than_days дней в архив"""
+    try:
+        moved = await run_in_threadpool(
+            archive_store.archive_returned, db, older_than_days, batch_size, max_batches
+        )
+        return {"moved": moved, **archive_store.stats(db)}
+    except Exception as e:
+        raise HTTPException(500, f"Ошибка архивации выдач: {str(e)}")
+
+
 # API для принудительной отметки выдачи как просроченной
 @app.post("/api/issues/{issue_id}/mark-overdue")
 async def mark_issue_overdue(issue_id: int, db: Session = Depends(get_db)):
@@ -337,8 +532,8 @@ async def mark_issue_overdue(issue_id: int, db: Session = Depends(get_db)):
 
 
 # API для отчетов
-@app.get("/api/reports/stats")
-async def get_stats(db: Session = Depends(get_db)):
+@app.get("/api/reports/stats", dependencies=[Depends(reports_limiter)])
+def get_stats(db: Session = Depends(get_read_db)):
     try:
         # Статистика по книгам
         books = book_store.list_books(db)
@@ -350,12 +545,12 @@ async def get_stats(db: Session = Depends(get_db)):
         total_readers = len(readers)
         active_readers = len([r for r in readers if r.status == "active"])
 
-        # Статистика по выдачам
-        issues = book_issue_store.list_issues(db)
-        total_issues = len(issues)
-        current_issues = len([i for i in issues if i.status == "issued"])
-        overdue_issues = len([i for i in issues if i.status == "overdue"])
-        returned_issues = len([i for i in issues if i.status == "returned"])
+        # Статистика по выдачам (возвращенные считаются вместе с архивом)
+        issue_counts = book_issue_store.status_counts(db)
+        total_issues = sum(issue_counts.values())
+        current_issues = issue_counts.get("issued", 0)
+        overdue_issues = issue_counts.get("overdue", 0)
+        returned_issues = issue_counts.get("returned", 0)
 
         # Статистика по жанрам
         genre_stats = {}
@@ -384,10 +579,60 @@ async def get_stats(db: Session = Depends(get_db)):
         raise HTTPException(500, f"Ошибка загрузки статистики: {str(e)}")
 
 
+# Аналитика выдач по дневным агрегатам
+@app.get("/api/reports/analytics", dependencies=[Depends(reports_limiter)])
+def get_analytics(
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        granularity: str = Query("day", pattern="^(day|month)$"),
+        top: int = Query(10, ge=1, le=100),
+        db: Session = Depends(get_read_db)
+):
+    """Выдачи по дням/месяцам, топ книг и читателей, длительность и просрочки по жанрам"""
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=30)
+    if date_from > date_to:
+        raise HTTPException(400, "Начало периода позже его окончания")
+
+    try:
+        return circulation_store.analytics(db, date_from, date_to, granularity, top)
+    except Exception as e:
+        raise HTTPException(500, f"Ошибка загрузки аналитики: {str(e)}")
+
+
+# Штрафы за просрочку (п. 5.1 правил библиотеки)
+@app.get("/api/reports/fines", dependencies=[Depends(reports_limiter)])
+def get_fines(
+        as_of: Optional[date] = None,
+        reader_id: Optional[int] = None,
+        include_returned: bool = True,
+        include_issues: bool = False,
+        top: int = Query(50, ge=1, le=1000),
+        per_day: Optional[float] = Query(None, ge=0),
+        grace_days: Optional[int] = Query(None, ge=0),
+        db: Session = Depends(get_read_db)
+):
+    """Штрафы по читателям (и по выдачам) с итогами; тариф можно переопределить параметрами"""
+    tariff = FineTariff()
+    if per_day is not None:
+        tariff.per_day = per_day
+    if grace_days is not None:
+        tariff.grace_days = grace_days
+
+    try:
+        return fines_engine.report(db, tariff, as_of, reader_id, include_returned, top, include_issues)
+    except Exception as e:
+        raise HTTPException(500, f"Ошибка расчета штрафов: {str(e)}")
+
+
 # Генерация сертификата качества книги
 # Упрощенная версия с фиксированной датой
-@app.get("/api/certificate/{book_id}")
-async def generate_certificate(book_id: int, db: Session = Depends(get_db)):
+@app.get("/api/certificate/{book_id}", dependencies=[Depends(export_limiter)])
+def generate_certificate(book_id: int, db: Session = Depends(get_read_db)):
+    # python-docx загружается при первой генерации сертификата
+    import shutil
+    from docx import Document
+
     try:
         print(f"🔍 Запрос на генерацию сертификата для книги ID: {book_id}")
 
@@ -501,40 +746,110 @@ async def generate_certificate(book_id: int, db: Session = Depends(get_db)):
         print(f"❌ Ошибка генерации сертификата: {str(e)}")
         raise HTTPException(500, f"Ошибка генерации сертификата: {str(e)}")
 
+# Отдача байтов из памяти с поддержкой ETag и HTTP Range
+def bytes_response(request: Request, content: bytes, media_type: str, filename: str,
+                   etag: str, last_modified: str, max_age: int = 3600) -> Response:
+    headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Cache-Control": f"public, max-age={max_age}",
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f"attachment; filename*=utf-8''{quote(filename)}",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    total = len(content)
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if not range_header or (if_range and if_range != etag):
+        return Response(content, media_type=media_type, headers=headers)
+
+    # Поддерживаем один диапазон: bytes=start-end, bytes=start-, bytes=-suffix
+    try:
+        unit, _, spec = range_header.partition("=")
+        if unit.strip() != "bytes" or "," in spec:
+            raise ValueError(range_header)
+        start_str, _, end_str = spec.strip().partition("-")
+        if start_str:
+            start = int(start_str)
+            end = min(int(end_str), total - 1) if end_str else total - 1
+        else:
+            start = max(total - int(end_str), 0)
+            end = total - 1
+        if start > end or start >= total:
+            raise ValueError(range_header)
+    except ValueError:
+        headers["Content-Range"] = f"bytes */{total}"
+        return Response(status_code=416, headers=headers)
+
+    headers["Content-Range"] = f"bytes {start}-{end}/{total}"
+    return Response(content[start:end + 1], status_code=206, media_type=media_type, headers=headers)
+
+
 # Скачивание правил библиотеки
 @app.get("/api/rules/download")
-async def download_rules():
+async def download_rules(request: Request):
     """Скачать правила библиотеки в формате PDF"""
     try:
-        # Путь к PDF файлу с правилами
-        rules_path = static_dir / "rules.pdf"
-
-        if not rules_path.exists():
-            rules_path = templates_dir / "rules.pdf"
-
-        if not rules_path.exists():
-            raise HTTPException(404, "Файл правил не найден")
-
-        return FileResponse(
-            path=rules_path,
-            filename="Правила_библиотеки.pdf",
-            media_type='application/pdf'
-        )
-
+        rules_pdf = await run_in_threadpool(get_rules_pdf)
     except Exception as e:
         raise HTTPException(500, f"Ошибка загрузки правил: {str(e)}")
 
+    return bytes_response(
+        request,
+        rules_pdf.content,
+        media_type='application/pdf',
+        filename="Правила_библиотеки.pdf",
+        etag=rules_pdf.etag,
+        last_modified=rules_pdf.last_modified,
+    )
+
+
+# Журнал событий выдачи и правок
+@app.get("/api/journal", response_model=CirculationEventPage)
+async def replay_journal(
+        since: datetime,
+        until: Optional[datetime] = None,
+        event_type: Optional[List[str]] = Query(None),
+        limit: int = Query(500, ge=1, le=5000),
+        cursor: Optional[str] = None,
+        include_pending: bool = True,
+        db: Session = Depends(get_db)
+):
+    """События за период [since, until) по порядку; include_pending сначала записывает буфер воркера"""
+    if until is not None and since >= until:
+        raise HTTPException(400, "Начало периода позже его окончания")
+
+    if include_pending:
+        await run_in_threadpool(event_journal.flush)
+    try:
+        return event_journal.replay(db, since, until, event_type, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
 
-@app.on_event("startup")
-def startup_event():
-    create_tables()
 
-    # Автоматическая проверка просрочек при запуске
+# Профили запросов
+@app.get("/api/profiles", dependencies=[Depends(require_profile_token)])
+async def list_profiles():
+    """Последние сохраненные профили запросов"""
+    return profile_store.list()
+
+
+@app.get("/api/profiles/{name}", dependencies=[Depends(require_profile_token)])
+async def download_profile(name: str):
+    """Скачать профиль: .html (pyinstrument) или .pstats (cProfile, например для snakeviz)"""
     try:
-        updated_count = book_issue_store.check_overdue_issues(get_db())
-        print(f"🔍 Автоматически проверены просрочки: обновлено {updated_count} выдач")
-    except Exception as e:
-        print(f"⚠️ Ошибка автоматической проверки просрочек: {e}")
+        path = profile_store.path(name)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    if not path.exists():
+        raise HTTPException(404, "Профиль не найден")
+
+    media_type = "text/html" if name.endswith(".html") else "application/octet-stream"
+    return FileResponse(path=path, filename=name, media_type=media_type)
 
 
 # Health check
@@ -545,7 +860,11 @@ async def health_check(db: Session = Depends(get_db)):
         return {
             "status": "healthy",
             "database": "connected",
-            "books_count": len(books)
+            "books_count": len(books),
+            "replica": replica_monitor.stats(),
+            "admission": admission_stats(),
+            "journal": event_journal.stats(),
+            "startup_ms": startup_timings
         }
     except Exception as e:
         raise HTTPException(500, f"Database error: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,254 @@
+import asyncio
+import functools
+import hmac
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+
+# pyinstrument — необязательная зависимость: статистический профайлер, понимающий async.
+# Без него используется cProfile из стандартной библиотеки (файлы .pstats)
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError:
+    SamplingProfiler = None
+
+PROFILE_DIR = Path(os.getenv("LIBTOOL_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "libtool-profiles")))
+# Сколько последних профилей хранить
+PROFILE_MAX_FILES = int(os.getenv("LIBTOOL_PROFILE_MAX_FILES", "50"))
+# Доля запросов, профилируемых случайно (0 — только по заголовку)
+PROFILE_SAMPLE_RATE = float(os.getenv("LIBTOOL_PROFILE_SAMPLE_RATE", "0"))
+# Токен администратора: запрос с заголовком X-Profile: <токен> профилируется всегда
+PROFILE_TOKEN = os.getenv("LIBTOOL_PROFILE_TOKEN")
+# Интервал выборки pyinstrument, секунд
+PROFILE_INTERVAL = float(os.getenv("LIBTOOL_PROFILE_INTERVAL", "0.001"))
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_NAME_RE = re.compile(r"^[\w.-]+\.(html|pstats)$")
+
+
+class ProfileStore:
+    """Каталог с последними профилями; старые файлы удаляются сверх лимита"""
+
+    def __init__(self, directory: Path, max_files: int):
+        self.directory = directory
+        self.max_files = max_files
+        self._lock = threading.Lock()
+
+    def new_name(self, method: str, path: str, extension: str) -> str:
+        slug = re.sub(r"[^\w-]+", "_", path.strip("/")) or "root"
+        return f"{time.strftime('%Y%m%d_%H%M%S')}_{method.lower()}_{slug[:60]}_{uuid.uuid4().hex[:6]}.{extension}"
+
+    def path(self, name: str) -> Path:
+        if not PROFILE_NAME_RE.match(name):
+            raise ValueError("Некорректное имя профиля")
+        return self.directory / name
+
+    def save(self, name: str, write):
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            write(self.directory / name)
+            self._prune()
+
+    def _prune(self):
+        files = sorted(self._files(), key=lambda p: p.stat().st_mtime, reverse=True)
+        for old in files[self.max_files:]:
+            old.unlink(missing_ok=True)
+
+    def _files(self):
+        if not self.directory.exists():
+            return []
+        return [p for p in self.directory.iterdir() if PROFILE_NAME_RE.match(p.name)]
+
+    def list(self):
+        profiles = []
+        for p in self._files():
+            try:
+                stat = p.stat()
+            except FileNotFoundError:
+                continue
+            profiles.append({"name": p.name, "size": stat.st_size, "created": stat.st_mtime})
+        return sorted(profiles, key=lambda item: item["created"], reverse=True)
+
+
+profile_store = ProfileStore(PROFILE_DIR, PROFILE_MAX_FILES)
+
+
+class RequestProfile:
+    """Профиль одного запроса: цикл событий и потоки пула, где выполнялись его sync-обработчики.
+
+    Профайлеры (и pyinstrument, и cProfile) видят только поток, в котором запущены,
+    поэтому в каждом потоке запускается свой, а при сохранении результаты объединяются.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.extension = "html" if SamplingProfiler is not None else "pstats"
+        self._results = []
+        self._lock = threading.Lock()
+
+    def _start(self, async_mode: str):
+        if SamplingProfiler is not None:
+            profiler = SamplingProfiler(interval=self.interval, async_mode=async_mode)
+            profiler.start()
+        else:
+            import cProfile
+
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+
+    def _stop(self, profiler):
+        if SamplingProfiler is not None:
+            result = profiler.stop()
+        else:
+            profiler.disable()
+            result = profiler
+        with self._lock:
+            self._results.append(result)
+
+    async def run_async(self, call):
+        profiler = self._start("enabled")
+        try:
+            return await call()
+        finally:
+            self._stop(profiler)
+
+    def run_sync(self, func, *args, **kwargs):
+        try:
+            profiler = self._start("disabled")
+        except (RuntimeError, ValueError):
+            # Профайлер в этом потоке недоступен (например, уже занят) — выполняем без него
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._stop(profiler)
+
+    def write(self, path: Path):
+        with self._lock:
+            results = list(self._results)
+        if SamplingProfiler is not None:
+            from pyinstrument.renderers import HTMLRenderer
+            from pyinstrument.session import Session
+
+            session = results[0]
+            for other in results[1:]:
+                session = Session.combine(session, other)
+            path.write_text(HTMLRenderer().render(session), encoding="utf-8")
+        else:
+            import pstats
+
+            pstats.Stats(*results).dump_stats(str(path))
+
+
+# Профиль текущего запроса; контекст копируется в поток пула вместе с вызовом обработчика
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("libtool_profile", default=None)
+
+
+def profiled_in_thread(func):
+    """Обертка sync-обработчика: при профилируемом запросе профилирует его в потоке пула"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = current_profile.get()
+        if profile is None:
+            return func(*args, **kwargs)
+        return profile.run_sync(func, *args, **kwargs)
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """Маршрут FastAPI, чей обычный (def) обработчик попадает в профиль запроса.
+
+    FastAPI выполняет такие обработчики в пуле потоков, которого не видит профайлер
+    цикла событий; обертка сохраняет синхронность, так что FastAPI по-прежнему
+    отправляет обработчик в пул, а сигнатура берется из исходной функции.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not asyncio.iscoroutinefunction(endpoint):
+            endpoint = profiled_in_thread(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+class ProfilingMiddleware:
+    """Профилирование отдельных запросов по заголовку администратора или по выборке.
+
+    Выключенный (нет токена и доля выборки 0) middleware сразу передает запрос дальше.
+    Одновременно профилируется не больше одного запроса на воркер: параллельные
+    профили мешали бы друг другу. Обычные (def) обработчики попадают в профиль,
+    если маршруты приложения используют ProfiledRoute. Без pyinstrument в профиль
+    попадают и другие запросы, выполнявшиеся в цикле событий во время ожиданий
+    профилируемого.
+    """
+
+    def __init__(self, app, store: ProfileStore = profile_store, sample_rate: float = PROFILE_SAMPLE_RATE,
+                 token: str = PROFILE_TOKEN, interval: float = PROFILE_INTERVAL):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self.token = token.encode() if token else None
+        self.interval = interval
+        self.enabled = bool(self.token) or sample_rate > 0
+        self._busy = threading.Lock()
+
+    def should_profile(self, scope) -> bool:
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    return hmac.compare_digest(value, self.token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http" or not self.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self._profile(scope, receive, send)
+        finally:
+            self._busy.release()
+
+    async def _profile(self, scope, receive, send):
+        profile = RequestProfile(self.interval)
+        name = self.store.new_name(scope["method"], scope["path"], profile.extension)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Profile-Id"] = name
+            await send(message)
+
+        token = current_profile.set(profile)
+        try:
+            await profile.run_async(lambda: self.app(scope, receive, send_wrapper))
+        finally:
+            current_profile.reset(token)
+            self.store.save(name, profile.write)
+
+
+def require_profile_token(request: Request):
+    """Зависимость для доступа к профилям: нужен заголовок X-Profile с токеном.
+
+    Без настроенного токена доступа нет ни у кого, эндпоинты отвечают 404
+    """
+    if not PROFILE_TOKEN:
+        raise HTTPException(404, "Not Found")
+    # Starlette декодирует заголовки как latin-1: обратное кодирование дает исходные байты
+    header = request.headers.get("x-profile", "").encode("latin-1")
+    if not hmac.compare_digest(header, PROFILE_TOKEN.encode()):
+        raise HTTPException(403, "Нужен токен профилирования")
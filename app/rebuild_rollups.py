@@ -0,0 +1,24 @@
+import argparse
+from datetime import date
+
+from app.models import SessionLocal, ensure_schema, circulation_store
+
+
+def rebuild_rollups(date_from=None, date_to=None):
+    """Пересчитывает дневные агрегаты выдач из таблицы book_issue"""
+    ensure_schema()
+    db = SessionLocal()
+    try:
+        rows = circulation_store.rebuild(db, date_from, date_to)
+        print(f"✅ Пересчитано {rows} строк агрегатов")
+        return rows
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пересчет дневных агрегатов выдач (backfill)")
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, help="Начало периода, ГГГГ-ММ-ДД")
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, help="Конец периода, ГГГГ-ММ-ДД")
+    args = parser.parse_args()
+    rebuild_rollups(args.date_from, args.date_to)
@@ -0,0 +1,25 @@
+import argparse
+import os
+
+import uvicorn
+
+
+def main():
+    """Запуск LibTool в нескольких воркерах.
+
+    Все воркеры стартуют сразу; схему БД и обслуживание (очистка временных
+    файлов, проверка просрочек) выполняет только один из них — лидер, остальные
+    его не ждут. Обслуживание выполняется раз в день: экземпляры, запущенные
+    позже в тот же день, его пропускают.
+    """
+    parser = argparse.ArgumentParser(description="Запуск LibTool")
+    parser.add_argument("--host", default=os.getenv("LIBTOOL_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("LIBTOOL_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("LIBTOOL_WORKERS", os.cpu_count() or 1)))
+    args = parser.parse_args()
+
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+# Эти библиотеки должны загружаться лениво, а не при импорте app.main
+LAZY_MODULES = ("openpyxl", "docx", "reportlab")
+
+# Запускается в отдельном процессе, чтобы измерять холодный старт
+INIT_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import app.main as main
+import_ms = (time.perf_counter() - started) * 1000
+main.startup_event()
+main.shutdown_event()
+print(json.dumps({"import_ms": import_ms, "stages": main.startup_timings}))
+"""
+
+
+def measure_imports():
+    """Импорт app.main с -X importtime: (общее время, мс; {прямой импорт: мс}; загруженные пакеты)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=PROJECT_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, raw_name = line[len("import time:"):].split("|")
+        name = raw_name.rstrip()
+        depth = len(name) - len(name.lstrip())
+        entries.append((depth, name.strip(), int(cumulative_us) / 1000))
+
+    # Дочерние импорты печатаются до родителя и с отступом на 2 пробела больше
+    main_depth, _, total_ms = next(entry for entry in entries if entry[1] == "app.main")
+    direct = {name: ms for depth, name, ms in entries if depth == main_depth + 2}
+    loaded = {name.split(".")[0] for _, name, _ in entries}
+    return total_ms, direct, loaded
+
+
+def measure_init():
+    """Импорт и startup_event в отдельном процессе (нужна доступная БД)"""
+    result = subprocess.run(
+        [sys.executable, "-c", INIT_SCRIPT],
+        cwd=PROJECT_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Отчет о времени старта LibTool")
+    parser.add_argument("--threshold-ms", type=float, default=1500,
+                        help="Порог времени импорта app.main; при превышении код выхода 1")
+    parser.add_argument("--top", type=int, default=15, help="Сколько самых дорогих модулей показать")
+    parser.add_argument("--init", action="store_true", help="Измерить и этапы startup_event (нужна БД)")
+    args = parser.parse_args()
+
+    import_ms, modules, loaded = measure_imports()
+
+    print(f"📦 Импорт app.main: {import_ms:.1f} мс")
+    for name, ms in sorted(modules.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"   {ms:8.1f} мс  {name}")
+
+    failed = False
+    eager = [name for name in LAZY_MODULES if name in loaded]
+    if eager:
+        print(f"❌ При импорте загружаются тяжелые модули: {', '.join(eager)}")
+        failed = True
+
+    if args.init:
+        init = measure_init()
+        print("🚀 Этапы старта воркера:")
+        for stage, ms in init["stages"].items():
+            print(f"   {ms:8.1f} мс  {stage}")
+
+    if import_ms > args.threshold_ms:
+        print(f"❌ Импорт дольше порога {args.threshold_ms:.0f} мс")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+    print("✅ Время старта в пределах порога")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,138 @@
 // static/js/app.js
+
+// Таблица с виртуальной прокруткой: в DOM только видимые строки (и немного про запас),
+// данные подгружаются с сервера страницами (keyset-курсор) по мере прокрутки
+class VirtualTable {
+    constructor(container, { headers, load, params = () => ({}), renderRow, toolbar = '',
+                             emptyText = 'Нет данных', pageSize = 200, rowHeight = 56, overscan = 8 }) {
+        this.headers = headers;
+        this.load = load;
+        this.params = params;
+        this.renderRow = renderRow;
+        this.emptyText = emptyText;
+        this.pageSize = pageSize;
+        this.rowHeight = rowHeight;
+        this.overscan = overscan;
+
+        this.rows = [];
+        this.total = 0;
+        this.nextCursor = null;
+        this.query = null;
+        this.controller = null;
+        this.loadingMore = false;
+        this.frame = null;
+
+        container.innerHTML = `
+            <div class="table-container">
+                ${toolbar}
+                <div class="virtual-scroll">
+                    <table class="table virtual-table">
+                        <thead><tr>${headers.map(h => `<th>${h}</th>`).join('')}</tr></thead>
+                        <tbody></tbody>
+                    </table>
+                </div>
+            </div>
+        `;
+        this.viewport = container.querySelector('.virtual-scroll');
+        this.tbody = container.querySelector('tbody');
+
+        this.viewport.addEventListener('scroll', () => this.scheduleRender(), { passive: true });
+        window.addEventListener('resize', () => this.scheduleRender());
+    }
+
+    buildQuery(cursor = null) {
+        const params = new URLSearchParams();
+        Object.entries(this.params()).forEach(([key, value]) => {
+            if (value !== '' && value !== null && value !== undefined) params.set(key, value);
+        });
+        params.set('limit', this.pageSize);
+        if (cursor) params.set('cursor', cursor);
+        return params;
+    }
+
+    // Загрузка первой страницы; при тех же фильтрах позиция прокрутки сохраняется
+    async reload() {
+        const query = this.buildQuery().toString();
+        const sameQuery = query === this.query;
+        this.query = query;
+
+        // Отменяем предыдущие запросы, чтобы устаревший ответ не перезаписал новый
+        this.controller?.abort();
+        this.controller = new AbortController();
+        this.loadingMore = false;
+
+        try {
+            const page = await this.load(query, this.controller.signal);
+            this.rows = page.items;
+            this.total = page.total ?? page.items.length;
+            this.nextCursor = page.next_cursor;
+            if (!sameQuery) this.viewport.scrollTop = 0;
+            this.render();
+        } catch (error) {
+            if (error.name !== 'AbortError') throw error;
+        }
+    }
+
+    async loadMore() {
+        if (this.loadingMore || !this.nextCursor) return;
+        this.loadingMore = true;
+        const controller = this.controller;
+
+        try {
+            const page = await this.load(this.buildQuery(this.nextCursor).toString(), controller.signal);
+            this.rows = this.rows.concat(page.items);
+            this.nextCursor = page.next_cursor;
+            this.render();
+        } catch (error) {
+            if (error.name !== 'AbortError') console.error('Ошибка подгрузки строк:', error);
+        } finally {
+            if (controller === this.controller) this.loadingMore = false;
+        }
+    }
+
+    scheduleRender() {
+        if (this.frame) return;
+        this.frame = requestAnimationFrame(() => {
+            this.frame = null;
+            this.render();
+        });
+    }
+
+    render() {
+        if (!this.rows.length) {
+            this.tbody.innerHTML = `<tr><td colspan="${this.headers.length}" class="text-center">${this.emptyText}</td></tr>`;
+            return;
+        }
+
+        // Высота прокрутки рассчитана на все строки (total), даже еще не загруженные
+        const count = Math.max(this.total, this.rows.length);
+        const scrollTop = this.viewport.scrollTop;
+        const height = this.viewport.clientHeight || 600;
+        const first = Math.min(this.rows.length, Math.max(0, Math.floor(scrollTop / this.rowHeight) - this.overscan));
+        const last = Math.max(first, Math.min(this.rows.length, Math.ceil((scrollTop + height) / this.rowHeight) + this.overscan));
+
+        this.tbody.innerHTML =
+            `<tr class="virtual-spacer" style="height: ${first * this.rowHeight}px"></tr>` +
+            this.rows.slice(first, last).map(row => `<tr class="virtual-row">${this.renderRow(row)}</tr>`).join('') +
+            `<tr class="virtual-spacer" style="height: ${(count - last) * this.rowHeight}px"></tr>`;
+
+        // Уточняем высоту строки по фактической отрисовке (пока таблица скрыта, она нулевая)
+        const measured = this.tbody.querySelector('.virtual-row')?.offsetHeight || 0;
+        if (measured && Math.abs(measured - this.rowHeight) > 1) {
+            this.rowHeight = measured;
+            this.scheduleRender();
+        }
+
+        // Дошли до конца загруженных строк — подгружаем следующую страницу
+        if (this.nextCursor && last >= this.rows.length - this.overscan) {
+            this.loadMore();
+        }
+    }
+}
+
 class LibToolApp {
     constructor() {
-        this.books = [];
-        this.readers = [];
-        this.issues = [];
+        this.tables = {};
         this.currentPage = 'books';
         this.genresChart = null;
         this.bookSortOrder = 'default';
@@ -36,6 +165,9 @@ class LibToolApp {
         // Фильтры
         this.setupFilterHandlers();
 
+        // Подсказки в форме выдачи
+        this.setupTypeaheads();
+
         console.log('✅ Все обработчики инициализированы');
     }
 
@@ -82,16 +214,21 @@ class LibToolApp {
     }
 
     setupFilterHandlers() {
-        const filters = {
+        // Поиск уходит на сервер, поэтому запрос отправляется после паузы в наборе
+        const searches = {
             'search': () => this.renderBooks(),
+            'search-readers': () => this.renderReaders()
+        };
+        const filters = {
             'filter-status': () => this.renderBooks(),
-            'search-readers': () => this.renderReaders(),
             'filter-status-readers': () => this.renderReaders(),
             'filter-status-issues': () => this.renderIssues()
         };
 
+        Object.entries(searches).forEach(([id, handler]) => {
+            document.getElementById(id)?.addEventListener('input', this.debounce(handler, 300));
+        });
         Object.entries(filters).forEach(([id, handler]) => {
-            document.getElementById(id)?.addEventListener('input', handler);
             document.getElementById(id)?.addEventListener('change', handler);
         });
     }
@@ -103,6 +240,14 @@ class LibToolApp {
         return div.innerHTML;
     }
 
+    debounce(handler, delay) {
+        let timer = null;
+        return (...args) => {
+            clearTimeout(timer);
+            timer = setTimeout(() => handler(...args), delay);
+        };
+    }
+
     showNotification(message, type = 'info') {
         const notification = document.createElement('div');
         notification.className = `notification ${type}`;
@@ -205,15 +350,37 @@ class LibToolApp {
     async loadData(type) {
         try {
             this.showLoading(type, true);
-            this[type] = await this.apiCall(`/api/${type}`);
-            this[`render${type.charAt(0).toUpperCase() + type.slice(1)}`]();
+            await this.getTable(type).reload();
         } catch (error) {
             this.showNotification(`Ошибка загрузки ${type}: ${error.message}`, 'error');
         } finally {
             this.showLoading(type, false);
+            this.tables[type]?.scheduleRender();
+        }
+    }
+
+    // Таблица создается один раз, дальше только перезагружаются ее данные
+    getTable(type) {
+        if (!this.tables[type]) {
+            const container = document.getElementById(`${type}-container`);
+            this.tables[type] = this[`render${type.charAt(0).toUpperCase() + type.slice(1)}TableView`](container);
+        }
+        return this.tables[type];
+    }
+
+    // Перезагрузка по фильтрам, без индикатора загрузки
+    async refreshTable(type) {
+        try {
+            await this.getTable(type).reload();
+        } catch (error) {
+            this.showNotification(`Ошибка загрузки ${type}: ${error.message}`, 'error');
         }
     }
 
+    loadPage(url, query, signal) {
+        return this.apiCall(`${url}?${query}`, { signal });
+    }
+
     async saveData(type, formData, id = null) {
         const url = id ? `/api/${type}/${id}` : `/api/${type}`;
         const method = id ? 'PUT' : 'POST';
@@ -250,49 +417,24 @@ class LibToolApp {
     async loadReaders() { await this.loadData('readers'); }
     async loadIssues() { await this.loadData('issues'); }
 
-    renderBooks() {
-        const container = document.getElementById('books-container');
-        if (!container) return;
-
-        const searchTerm = document.getElementById('search')?.value.toLowerCase() || '';
-        const statusFilter = document.getElementById('filter-status')?.value || '';
-
-        let filteredBooks = this.books.filter(book => {
-            const matchesSearch = book.name.toLowerCase().includes(searchTerm) ||
-                                book.author.toLowerCase().includes(searchTerm);
-            const matchesStatus = !statusFilter || book.status === statusFilter;
-            return matchesSearch && matchesStatus;
-        });
-
-        filteredBooks = this.sortBooks(filteredBooks);
-        this.renderBooksTableView(container, filteredBooks);
-    }
-
-    sortBooks(books) {
-        const sortMethods = {
-            'count_asc': (a, b) => a.count - b.count,
-            'count_desc': (a, b) => b.count - a.count,
-            'default': () => 0
-        };
-
-        return [...books].sort(sortMethods[this.bookSortOrder] || sortMethods.default);
-    }
+    renderBooks() { this.refreshTable('books'); }
 
     setBookSortOrder(order) {
         this.bookSortOrder = order;
         this.renderBooks();
     }
 
-    renderBooksTableView(container, books) {
-        if (!books.length) {
-            container.innerHTML = '<div class="text-center">Книги не найдены</div>';
-            return;
-        }
-
-        const headers = ['ID', 'Название', 'Автор', 'Жанр', 'Кол-во', 'Статус', 'Действия'];
-
-        let html = `
-            <div class="table-container">
+    renderBooksTableView(container) {
+        return new VirtualTable(container, {
+            headers: ['ID', 'Название', 'Автор', 'Жанр', 'Кол-во', 'Статус', 'Действия'],
+            emptyText: 'Книги не найдены',
+            load: (query, signal) => this.loadPage('/api/books/page', query, signal),
+            params: () => ({
+                q: document.getElementById('search')?.value.trim() || '',
+                status: document.getElementById('filter-status')?.value || '',
+                sort: this.bookSortOrder
+            }),
+            toolbar: `
                 <div class="table-header">
                     <div class="sort-controls">
                         <label>Сортировка по количеству:</label>
@@ -303,39 +445,29 @@ class LibToolApp {
                         </select>
                     </div>
                 </div>
-                <table class="table">
-                    <thead><tr>${headers.map(h => `<th>${h}</th>`).join('')}</tr></thead>
-                    <tbody>
-        `;
-
-        books.forEach(book => {
-            html += `
-                <tr>
-                    <td>${book.id}</td>
-                    <td><strong>${this.escapeHtml(book.name)}</strong></td>
-                    <td>${this.escapeHtml(book.author)}</td>
-                    <td>${this.escapeHtml(book.genre || '-')}</td>
-                    <td>${book.count}</td>
-                    <td class="status-${book.status}">${this.getBookStatusText(book.status)}</td>
-                    <td>
-                        <div class="table-actions">
-                            <button class="btn success small" onclick="app.downloadCertificate(${book.id})" title="Скачать сертификат">
-                                📄 Сертификат
-                            </button>
-                            <button class="btn secondary small" onclick="app.editBook(${book.id})" title="Редактировать">
-                                ✏️ Редактировать
-                            </button>
-                            <button class="btn danger small" onclick="app.deleteBook(${book.id})" title="Удалить">
-                                🗑️ Удалить
-                            </button>
-                        </div>
-                    </td>
-                </tr>
-            `;
+            `,
+            renderRow: book => `
+                <td>${book.id}</td>
+                <td><strong>${this.escapeHtml(book.name)}</strong></td>
+                <td>${this.escapeHtml(book.author)}</td>
+                <td>${this.escapeHtml(book.genre || '-')}</td>
+                <td>${book.count}</td>
+                <td class="status-${book.status}">${this.getBookStatusText(book.status)}</td>
+                <td>
+                    <div class="table-actions">
+                        <button class="btn success small" onclick="app.downloadCertificate(${book.id})" title="Скачать сертификат">
+                            📄 Сертификат
+                        </button>
+                        <button class="btn secondary small" onclick="app.editBook(${book.id})" title="Редактировать">
+                            ✏️ Редактировать
+                        </button>
+                        <button class="btn danger small" onclick="app.deleteBook(${book.id})" title="Удалить">
+                            🗑️ Удалить
+                        </button>
+                    </div>
+                </td>
+            `
         });
-
-        html += '</tbody></table></div>';
-        container.innerHTML = html;
     }
 
     getBookStatusText(status) {
@@ -351,6 +483,7 @@ class LibToolApp {
             this.showNotification('Генерация сертификата...', 'info');
             const response = await fetch(`/api/certificate/${bookId}`);
 
+            if (response.status === 503) throw new Error(this.busyMessage(response));
             if (!response.ok) throw new Error('Ошибка генерации сертификата');
 
             await this.downloadFile(response, `certificate_book_${bookId}.docx`);
@@ -360,6 +493,12 @@ class LibToolApp {
         }
     }
 
+    // Сервер ограничивает число одновременных выгрузок и отвечает 503 с Retry-After
+    busyMessage(response) {
+        const retryAfter = response.headers.get('retry-after') || '5';
+        return `сервер занят другими выгрузками, повторите через ${retryAfter} с`;
+    }
+
     // Скачивание файлов (общий метод)
     async downloadFile(response, defaultFilename) {
         const blob = await response.blob();
@@ -476,77 +615,90 @@ class LibToolApp {
     }
 
     // Читатели
-    renderReaders() {
-        const container = document.getElementById('readers-container');
-        if (!container) return;
-
-        const searchTerm = document.getElementById('search-readers')?.value.toLowerCase() || '';
-        const statusFilter = document.getElementById('filter-status-readers')?.value || '';
-
-        const filteredReaders = this.readers.filter(reader => {
-            const matchesSearch = reader.full_name.toLowerCase().includes(searchTerm);
-            const matchesStatus = !statusFilter || reader.status === statusFilter;
-            return matchesSearch && matchesStatus;
+    renderReaders() { this.refreshTable('readers'); }
+
+    renderReadersTableView(container) {
+        return new VirtualTable(container, {
+            headers: ['ФИО', 'Контакты', 'Адрес', 'Дата регистрации', 'Книг на руках', 'Статус', 'Действия'],
+            emptyText: 'Читатели не найдены',
+            load: (query, signal) => this.loadPage('/api/readers/page', query, signal),
+            params: () => ({
+                q: document.getElementById('search-readers')?.value.trim() || '',
+                status: document.getElementById('filter-status-readers')?.value || ''
+            }),
+            renderRow: reader => `
+                <td><strong>${this.escapeHtml(reader.full_name)}</strong></td>
+                <td>
+                    ${reader.phone ? `📞 ${this.escapeHtml(reader.phone)}` : ''}
+                    ${reader.email ? `📧 ${this.escapeHtml(reader.email)}` : ''}
+                </td>
+                <td>${this.escapeHtml(reader.address || '-')}</td>
+                <td>${new Date(reader.registration_date).toLocaleDateString('ru-RU')}</td>
+                <td>${reader.books_count}</td>
+                <td class="status-${reader.status}">${reader.status === 'active' ? 'Активен' : 'Неактивен'}</td>
+                <td>
+                    <div class="table-actions">
+                        <button class="btn secondary small" onclick="app.editReader(${reader.id})">
+                            ✏️ Редактировать
+                        </button>
+                        <button class="btn danger small" onclick="app.deleteReader(${reader.id})">
+                            🗑️ Удалить
+                        </button>
+                    </div>
+                </td>
+            `
         });
+    }
 
-        this.renderReadersTableView(container, filteredReaders);
+    openReaderModal(reader = null) {
+        this.openModal('reader', reader);
+        if (!reader) document.getElementById('reader-history')?.classList.add('hidden');
     }
+    closeReaderModal() { this.closeModal('reader'); }
 
-    renderReadersTableView(container, readers) {
-        if (!readers.length) {
-            container.innerHTML = '<div class="text-center">Читатели не найдены</div>';
-            return;
+    async editReader(readerId) {
+        try {
+            const reader = await this.apiCall(`/api/readers/${readerId}`);
+            this.openReaderModal(reader);
+            await this.showReaderHistory(readerId);
+        } catch (error) {
+            this.showNotification('Ошибка загрузки читателя: ' + error.message, 'error');
         }
+    }
 
-        const headers = ['ФИО', 'Контакты', 'Адрес', 'Дата регистрации', 'Книг на руках', 'Статус', 'Действия'];
-
-        let html = `
-            <div class="table-container">
-                <table class="table">
-                    <thead><tr>${headers.map(h => `<th>${h}</th>`).join('')}</tr></thead>
-                    <tbody>
-        `;
+    // История выдач в карточке читателя, "Показать еще" догружает следующую страницу
+    async showReaderHistory(readerId, cursor = null) {
+        const section = document.getElementById('reader-history');
+        const list = document.getElementById('reader-history-list');
+        const more = document.getElementById('reader-history-more');
+        if (!section || !list || !more) return;
 
-        readers.forEach(reader => {
-            html += `
-                <tr>
-                    <td><strong>${this.escapeHtml(reader.full_name)}</strong></td>
-                    <td>
-                        ${reader.phone ? `📞 ${this.escapeHtml(reader.phone)}<br>` : ''}
-                        ${reader.email ? `📧 ${this.escapeHtml(reader.email)}` : ''}
-                    </td>
-                    <td>${this.escapeHtml(reader.address || '-')}</td>
-                    <td>${new Date(reader.registration_date).toLocaleDateString('ru-RU')}</td>
-                    <td>${reader.books_count}</td>
-                    <td class="status-${reader.status}">${reader.status === 'active' ? 'Активен' : 'Неактивен'}</td>
-                    <td>
-                        <div class="table-actions">
-                            <button class="btn secondary small" onclick="app.editReader(${reader.id})">
-                                ✏️ Редактировать
-                            </button>
-                            <button class="btn danger small" onclick="app.deleteReader(${reader.id})">
-                                🗑️ Удалить
-                            </button>
-                        </div>
-                    </td>
-                </tr>
-            `;
-        });
+        if (!cursor) list.innerHTML = '';
+        section.classList.remove('hidden');
 
-        html += '</tbody></table></div>';
-        container.innerHTML = html;
+        const page = await this.loadReaderIssues(readerId, { cursor, limit: 20 });
+        if (!cursor && !page.items.length) {
+            list.innerHTML = '<li class="text-center">Выдач нет</li>';
+        }
+        list.insertAdjacentHTML('beforeend', page.items.map(issue => `
+            <li>
+                <span>${new Date(issue.issue_date).toLocaleDateString('ru-RU')}</span>
+                <span>${this.escapeHtml(issue.book_name)}</span>
+                <span class="status-${issue.status}">${this.getIssueStatusText(issue.status)}</span>
+            </li>
+        `).join(''));
+
+        more.classList.toggle('hidden', !page.next_cursor);
+        more.onclick = () => this.showReaderHistory(readerId, page.next_cursor)
+            .catch(error => this.showNotification('Ошибка загрузки истории: ' + error.message, 'error'));
     }
 
-    openReaderModal(reader = null) { this.openModal('reader', reader); }
-    closeReaderModal() { this.closeModal('reader'); }
-
-    editReader(readerId) {
-        const reader = this.readers.find(r => r.id === readerId);
-        if (reader) {
-            this.openReaderModal(reader);
-        } else {
-            this.showNotification('Читатель не найден', 'error');
-        }
+    // История выдач читателя (постранично, курсор из предыдущего ответа)
+    async loadReaderIssues(readerId, { status = [], cursor = null, limit = 50 } = {}) {
+        const params = new URLSearchParams({ limit });
+        status.forEach(s => params.append('status', s));
+        if (cursor) params.set('cursor', cursor);
+        return await this.apiCall(`/api/readers/${readerId}/issues?${params}`);
     }
 
     async saveReader(event) {
@@ -576,43 +728,25 @@ class LibToolApp {
     }
 
     // Выдачи книг
-    renderIssues() {
-        const container = document.getElementById('issues-container');
-        if (!container) return;
-
-        const statusFilter = document.getElementById('filter-status-issues')?.value || '';
-        const filteredIssues = this.issues.filter(issue =>
-            !statusFilter || issue.status === statusFilter
-        );
-
-        this.renderIssuesTableView(container, filteredIssues);
-    }
-
-    renderIssuesTableView(container, issues) {
-        if (!issues.length) {
-            container.innerHTML = '<div class="text-center">Выдачи не найдены</div>';
-            return;
-        }
-
-        const headers = ['Книга', 'Читатель', 'Дата выдачи', 'Планируемый возврат', 'Фактический возврат', 'Статус', 'Действия'];
-
-        let html = `
-            <div class="table-container">
-                <table class="table">
-                    <thead><tr>${headers.map(h => `<th>${h}</th>`).join('')}</tr></thead>
-                    <tbody>
-        `;
-
-        issues.forEach(issue => {
-            const isOverdue = issue.status === 'overdue';
-            const isIssued = issue.status === 'issued';
-            const statusClass = 'status-' + issue.status;
-            let statusText = this.getIssueStatusText(issue.status);
-
-            if (isOverdue) statusText = '⏰ ' + statusText;
-
-            html += `
-                <tr>
+    renderIssues() { this.refreshTable('issues'); }
+
+    renderIssuesTableView(container) {
+        return new VirtualTable(container, {
+            headers: ['Книга', 'Читатель', 'Дата выдачи', 'Планируемый возврат', 'Фактический возврат', 'Статус', 'Действия'],
+            emptyText: 'Выдачи не найдены',
+            load: (query, signal) => this.loadPage('/api/issues/page', query, signal),
+            params: () => ({
+                status: document.getElementById('filter-status-issues')?.value || ''
+            }),
+            renderRow: issue => {
+                const isOverdue = issue.status === 'overdue';
+                const isIssued = issue.status === 'issued';
+                const statusClass = 'status-' + issue.status;
+                let statusText = this.getIssueStatusText(issue.status);
+
+                if (isOverdue) statusText = '⏰ ' + statusText;
+
+                return `
                     <td><strong>${this.escapeHtml(issue.book_name)}</strong></td>
                     <td>${this.escapeHtml(issue.reader_name)}</td>
                     <td>${new Date(issue.issue_date).toLocaleDateString('ru-RU')}</td>
@@ -633,12 +767,9 @@ class LibToolApp {
                             </div>
                         ` : '<span class="text-center">-</span>'}
                     </td>
-                </tr>
-            `;
+                `;
+            }
         });
-
-        html += '</tbody></table></div>';
-        container.innerHTML = html;
     }
 
     getIssueStatusText(status) {
@@ -656,6 +787,7 @@ class LibToolApp {
             this.showNotification('Подготовка Excel файла...', 'info');
             const response = await fetch('/api/issues/export-excel');
 
+            if (response.status === 503) throw new Error(this.busyMessage(response));
             if (!response.ok) throw new Error(`Ошибка создания Excel файла: ${response.status}`);
 
             await this.downloadFile(response, 'выдачи_книг.xlsx');
@@ -690,7 +822,7 @@ class LibToolApp {
     }
 
     openIssueModal() {
-        this.populateIssueSelects();
+        this.resetTypeaheads();
         const modal = document.getElementById('modal-issue');
 
         // Установка дат по умолчанию
@@ -705,26 +837,123 @@ class LibToolApp {
 
     closeIssueModal() { this.closeModal('issue'); }
 
-    async populateIssueSelects() {
-        if (this.books.length === 0) await this.loadBooks();
-        if (this.readers.length === 0) await this.loadReaders();
-
-        const selects = {
-            'issue-book': this.books.filter(book => book.count > 0 && book.status === 'available'),
-            'issue-reader': this.readers.filter(reader => reader.status === 'active')
+    // Подсказки: книги и читатели запрашиваются с сервера по мере ввода
+    setupTypeaheads() {
+        this.typeaheads = {
+            'issue-book': {
+                url: '/api/books/lookup',
+                label: book => `${book.name} - ${book.author} (доступно: ${book.count})`
+            },
+            'issue-reader': {
+                url: '/api/readers/lookup',
+                label: reader => `${reader.full_name} (книг на руках: ${reader.books_count})`
+            }
         };
 
-        Object.entries(selects).forEach(([selectId, items]) => {
-            const select = document.getElementById(selectId);
-            select.innerHTML = `<option value="">Выберите ${selectId.split('-')[1]}</option>`;
+        Object.entries(this.typeaheads).forEach(([id, config]) => {
+            const input = document.getElementById(`${id}-search`);
+            const results = document.getElementById(`${id}-results`);
+            if (!input || !results) return;
+
+            config.timer = null;
+            config.controller = null;
+            config.items = [];
+            config.active = -1;
 
-            items.forEach(item => {
-                const option = document.createElement('option');
-                option.value = item.id;
-                const suffix = selectId.includes('book') ? ` (доступно: ${item.count})` : ` (книг на руках: ${item.books_count})`;
-                option.textContent = `${item.name || item.full_name}${suffix}`;
-                select.appendChild(option);
+            input.addEventListener('input', () => {
+                document.getElementById(id).value = '';
+                clearTimeout(config.timer);
+                config.timer = setTimeout(() => this.fetchTypeahead(id), 150);
             });
+
+            input.addEventListener('keydown', (e) => {
+                if (results.classList.contains('hidden') || !config.items.length) return;
+
+                if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+                    e.preventDefault();
+                    const step = e.key === 'ArrowDown' ? 1 : -1;
+                    config.active = (config.active + step + config.items.length) % config.items.length;
+                    this.renderTypeahead(id);
+                } else if (e.key === 'Enter' && config.active >= 0) {
+                    e.preventDefault();
+                    this.selectTypeahead(id, config.active);
+                } else if (e.key === 'Escape') {
+                    results.classList.add('hidden');
+                }
+            });
+
+            input.addEventListener('blur', () => {
+                // Даем сработать клику по подсказке до скрытия списка
+                setTimeout(() => results.classList.add('hidden'), 150);
+            });
+
+            results.addEventListener('mousedown', (e) => {
+                const item = e.target.closest('.typeahead-item');
+                if (item) this.selectTypeahead(id, parseInt(item.dataset.index));
+            });
+        });
+    }
+
+    async fetchTypeahead(id) {
+        const config = this.typeaheads[id];
+        const prefix = document.getElementById(`${id}-search`).value.trim();
+        const results = document.getElementById(`${id}-results`);
+
+        // Отменяем предыдущий запрос, чтобы устаревший ответ не перезаписал новый
+        config.controller?.abort();
+
+        if (!prefix) {
+            config.items = [];
+            results.classList.add('hidden');
+            return;
+        }
+
+        config.controller = new AbortController();
+        try {
+            const params = new URLSearchParams({ prefix, limit: 10 });
+            config.items = await this.apiCall(`${config.url}?${params}`, { signal: config.controller.signal });
+            config.active = config.items.length ? 0 : -1;
+            this.renderTypeahead(id);
+        } catch (error) {
+            if (error.name !== 'AbortError') {
+                this.showNotification('Ошибка поиска: ' + error.message, 'error');
+            }
+        }
+    }
+
+    renderTypeahead(id) {
+        const config = this.typeaheads[id];
+        const results = document.getElementById(`${id}-results`);
+
+        results.innerHTML = config.items.length
+            ? config.items.map((item, index) => `
+                <div class="typeahead-item ${index === config.active ? 'active' : ''}" data-index="${index}">
+                    ${this.escapeHtml(config.label(item))}
+                </div>
+            `).join('')
+            : '<div class="typeahead-empty">Ничего не найдено</div>';
+
+        results.classList.remove('hidden');
+    }
+
+    selectTypeahead(id, index) {
+        const config = this.typeaheads[id];
+        const item = config.items[index];
+        if (!item) return;
+
+        document.getElementById(id).value = item.id;
+        document.getElementById(`${id}-search`).value = config.label(item);
+        document.getElementById(`${id}-results`).classList.add('hidden');
+    }
+
+    resetTypeaheads() {
+        Object.entries(this.typeaheads || {}).forEach(([id, config]) => {
+            config.controller?.abort();
+            config.items = [];
+            config.active = -1;
+            document.getElementById(id).value = '';
+            document.getElementById(`${id}-search`).value = '';
+            document.getElementById(`${id}-results`).classList.add('hidden');
         });
     }
 
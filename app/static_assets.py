@@ -0,0 +1,110 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+from pathlib import Path
+
+from fastapi.responses import FileResponse
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+
+from app.compression import brotli, choose_encoding
+
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+DIST_DIR = STATIC_DIR / "dist"
+MANIFEST_PATH = DIST_DIR / "manifest.json"
+
+# Файлы, которые получают хэш в имени
+FINGERPRINT_SUFFIXES = (".js", ".css")
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+_manifest = None
+
+
+def load_manifest() -> dict:
+    """Манифест {исходный путь: путь с хэшем}; пустой, если сборка не выполнялась"""
+    global _manifest
+    if _manifest is None:
+        try:
+            _manifest = json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest
+
+
+def asset_url(path: str) -> str:
+    """URL статического файла для шаблонов: версия с хэшем, если она собрана"""
+    return "/static/" + load_manifest().get(path, path)
+
+
+class AssetStaticFiles(StaticFiles):
+    """StaticFiles, отдающий собранные файлы из dist/ как immutable и уже сжатыми"""
+
+    async def get_response(self, path: str, scope):
+        if not path.startswith("dist" + os.sep) and not path.startswith("dist/"):
+            return await super().get_response(path, scope)
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        extension = {"br": ".br", "gzip": ".gz"}.get(encoding)
+        full_path = (STATIC_DIR / path).resolve()
+        compressed_path = full_path.with_name(full_path.name + extension) if extension else None
+        inside_dist = DIST_DIR.resolve() in full_path.parents
+
+        if inside_dist and compressed_path and compressed_path.is_file() and full_path.is_file():
+            media_type = mimetypes.guess_type(full_path.name)[0] or "application/octet-stream"
+            return FileResponse(
+                compressed_path,
+                media_type=media_type,
+                headers={
+                    "Content-Encoding": encoding,
+                    "Cache-Control": IMMUTABLE_CACHE,
+                    "Vary": "Accept-Encoding",
+                },
+            )
+
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE
+            response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+def build_static(static_dir: Path = STATIC_DIR) -> dict:
+    """Собирает dist/: файлы с хэшем содержимого в имени, .gz/.br рядом и manifest.json"""
+    dist_dir = static_dir / "dist"
+    dist_dir.mkdir(exist_ok=True)
+
+    # Удаляем результаты прошлой сборки
+    for old_file in dist_dir.iterdir():
+        if old_file.is_file():
+            old_file.unlink()
+
+    manifest = {}
+    for source in sorted(static_dir.rglob("*")):
+        if dist_dir in source.parents or not source.is_file() or source.suffix not in FINGERPRINT_SUFFIXES:
+            continue
+
+        content = source.read_bytes()
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        target = dist_dir / f"{source.stem}.{digest}{source.suffix}"
+
+        target.write_bytes(content)
+        target.with_name(target.name + ".gz").write_bytes(gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            target.with_name(target.name + ".br").write_bytes(brotli.compress(content, quality=11))
+
+        relative = source.relative_to(static_dir).as_posix()
+        manifest[relative] = target.relative_to(static_dir).as_posix()
+        print(f"📦 {relative} -> {manifest[relative]}")
+
+    (dist_dir / "manifest.json").write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    if brotli is None:
+        print("⚠️ brotli не установлен: собраны только .gz версии")
+    print(f"✅ Собрано {len(manifest)} статических файлов")
+    return manifest
+
+
+if __name__ == "__main__":
+    build_static()
@@ -0,0 +1,79 @@
+"""Профилирование запросов (app/profiling.py): обычные (def) обработчики выполняются
+в пуле потоков и тоже должны попадать в сохраненный профиль."""
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import profiling
+from app.profiling import ProfileStore, ProfiledRoute, ProfilingMiddleware
+
+
+def busy_report_in_threadpool():
+    # Уникальное имя функции, которое ищем в профиле
+    deadline = time.perf_counter() + 0.05
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(1000))
+    return total
+
+
+def make_client(store: ProfileStore) -> TestClient:
+    app = FastAPI()
+    app.router.route_class = ProfiledRoute
+    app.add_middleware(ProfilingMiddleware, store=store, token="secret", sample_rate=0)
+
+    @app.get("/report")
+    def report():
+        return {"total": busy_report_in_threadpool()}
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("sampling", [True, False], ids=["pyinstrument", "cprofile"])
+def test_sync_route_frames_are_in_profile(tmp_path, monkeypatch, sampling):
+    if sampling and profiling.SamplingProfiler is None:
+        pytest.skip("pyinstrument не установлен")
+    if not sampling:
+        monkeypatch.setattr(profiling, "SamplingProfiler", None)
+
+    store = ProfileStore(tmp_path, max_files=5)
+    client = make_client(store)
+
+    response = client.get("/report", headers={"X-Profile": "secret"})
+    assert response.status_code == 200
+
+    name = response.headers["X-Profile-Id"]
+    assert name.endswith(".html" if sampling else ".pstats")
+    assert b"busy_report_in_threadpool" in (tmp_path / name).read_bytes()
+
+
+def test_request_without_token_is_not_profiled(tmp_path):
+    client = make_client(ProfileStore(tmp_path, max_files=5))
+
+    for headers in ({}, {"X-Profile": "wrong"}, {"X-Profile": "тест".encode()}):
+        response = client.get("/report", headers=headers)
+        assert response.status_code == 200
+        assert "X-Profile-Id" not in response.headers
+    assert not list(tmp_path.iterdir())
+
+
+def test_profile_endpoints_token(monkeypatch):
+    from fastapi import Depends
+
+    app = FastAPI()
+
+    @app.get("/profiles", dependencies=[Depends(profiling.require_profile_token)])
+    def profiles():
+        return []
+
+    client = TestClient(app)
+
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", None)
+    assert client.get("/profiles", headers={"X-Profile": "secret"}).status_code == 404
+
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    assert client.get("/profiles").status_code == 403
+    assert client.get("/profiles", headers={"X-Profile": "тест".encode()}).status_code == 403
+    assert client.get("/profiles", headers={"X-Profile": "secret"}).status_code == 200
@@ -0,0 +1,95 @@
+"""Число SQL-запросов на путях записи (INSERT/UPDATE ... RETURNING, см. app/models.py).
+
+Хранилища вызываются напрямую на сессии SQLite в памяти; считаются все команды,
+которые SQLAlchemy отправляет драйверу.
+"""
+import os
+from datetime import date, timedelta
+
+os.environ.setdefault("LIBTOOL_DATABASE_URL", "sqlite://")
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models import (
+    Base, BookCreate, BookUpdate, ReaderCreate, ReaderUpdate, BookIssueCreate,
+    book_store, reader_store, book_issue_store
+)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def statements(db):
+    """Список отправленных в БД команд; очищается перед проверяемым вызовом"""
+    executed = []
+    event.listen(db.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: executed.append(statement))
+    return executed
+
+
+def count(statements, call):
+    statements.clear()
+    result = call()
+    return result, len(statements)
+
+
+def test_book_create_and_update(db, statements):
+    book, n = count(statements, lambda: book_store.create_book(
+        db, BookCreate(name="Война и мир", author="Толстой", count=2)))
+    assert n == 1
+    assert book.id and book.status == "available"
+
+    updated, n = count(statements, lambda: book_store.update_book(
+        db, book.id, BookUpdate(name="Война и мир", author="Толстой Л. Н.", count=3)))
+    assert n == 1
+    assert updated.author == "Толстой Л. Н." and updated.count == 3
+
+
+def test_update_missing_book(db, statements):
+    result, n = count(statements, lambda: book_store.update_book(
+        db, 999, BookUpdate(name="Нет", author="Нет", count=1)))
+    assert result is None
+    assert n == 1
+
+
+def test_reader_create_and_update(db, statements):
+    reader, n = count(statements, lambda: reader_store.create_reader(db, ReaderCreate(full_name="Иванов Иван")))
+    assert n == 1
+    assert reader.books_count == 0
+
+    updated, n = count(statements, lambda: reader_store.update_reader(
+        db, reader.id, ReaderUpdate(full_name="Иванов И. И.", status="inactive")))
+    assert n == 1
+    assert updated.full_name == "Иванов И. И." and updated.status == "inactive"
+
+
+def test_issue_and_conflict(db, statements):
+    book = book_store.create_book(db, BookCreate(name="Анна Каренина", author="Толстой", count=1))
+    reader = reader_store.create_reader(db, ReaderCreate(full_name="Петров Петр"))
+    issue_data = BookIssueCreate(book_id=book.id, reader_id=reader.id,
+                                 planned_return_date=date.today() + timedelta(days=14))
+
+    # UPDATE остатка, INSERT выдачи, дневной агрегат книги, дневной агрегат читателя
+    issue, n = count(statements, lambda: book_issue_store.issue_book(db, issue_data))
+    assert n == 4
+    assert issue.book_name == "Анна Каренина - Толстой" and issue.reader_name == "Петров Петр"
+
+    # Экземпляров не осталось: один условный UPDATE без строк, затем отказ (409 в API)
+    statements.clear()
+    with pytest.raises(ValueError):
+        book_issue_store.issue_book(db, issue_data)
+    assert len(statements) == 1
+    assert book_store.get_book(db, book.id).count == 0